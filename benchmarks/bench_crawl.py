@@ -0,0 +1,162 @@
+"""End-to-end crawl benchmark of MRPLScraperV4_WithPDF against the local MRPL stand-in.
+
+Usage:
+    python benchmarks/bench_crawl.py [--pages 50] [--concurrency 3] [--latency 0.05]
+                                     [--error-rate 0.0] [--tls] [--no-pdfs] [--corpus DIR]
+                                     [--output-mode inline|normalized] [--memory-mb MB]
+                                     [--pdf-concurrency 4] [--pdf-budget-mb MB] [--no-prescreen]
+                                     [--export jsonl-gzip|jsonl-zstd|parquet] [--search-index]
+                                     [--profile PROFILE.json]
+
+Starts benchmarks/mrpl_standin.py in a subprocess, points the scraper's base
+URL at it and reports pages/sec, PDFs/sec, p50/p95 latency per stage (from the
+scraper's own RunMetrics) and peak memory. Actor storage goes to a temp directory, so nothing touches ./storage
+or the network.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_standin(args, port):
+    command = [sys.executable, os.path.join(HERE, 'mrpl_standin.py'), '--port', str(port),
+               '--latency', str(args.latency), '--error-rate', str(args.error_rate)]
+    if args.tls:
+        command.append('--tls')
+    if args.corpus:
+        command += ['--corpus', args.corpus]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    process.stdout.readline()  # "Serving ..." once the socket is listening
+    return process
+
+
+async def run_crawl(args, base_url):
+    from apify import Actor
+    from main import MRPLScraperV4_WithPDF
+
+    scraper = MRPLScraperV4_WithPDF(
+        max_pages=args.pages,
+        delay=1,
+        extract_pdfs=not args.no_pdfs,
+        max_concurrency=args.concurrency,
+        requests_per_second=args.rps,
+        burst=args.concurrency,
+        adaptive_rate_limit=False,
+        pdf_workers=args.pdf_workers,
+        pdf_concurrency=args.pdf_concurrency,
+        pdf_budget_mb=args.pdf_budget_mb,
+        pdf_prescreen=not args.no_prescreen,
+        export_format=args.export,
+        search_index=args.search_index,
+        pdf_cache=False,
+        base_url=base_url,
+        output_mode=args.output_mode,
+        memory_budget_mb=args.memory_mb,
+        site_profile=args.profile
+    )
+    # Keep the process alive on exit so the report can be printed
+    async with Actor(exit_process=False):
+        started = time.perf_counter()
+        pages = await scraper.run()
+        elapsed = time.perf_counter() - started
+        if args.search_index:
+            # run() closed the index; query the copy it saved
+            store = await Actor.open_key_value_store(name=scraper.search_index.store_name)
+            scraper.search_index_saved = await store.get_value(scraper.search_index.STATE_KEY)
+    return scraper, pages, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=3)
+    parser.add_argument('--pdf-workers', type=int, default=2)
+    parser.add_argument('--pdf-concurrency', type=int, default=4, help='PDFs in flight across the crawl')
+    parser.add_argument('--pdf-budget-mb', type=int, help='PDF bytes downloaded per run (default: unlimited)')
+    parser.add_argument('--rps', type=float, default=1000.0, help='Per-host rate limit for the run')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--tls', action='store_true')
+    parser.add_argument('--no-pdfs', action='store_true')
+    parser.add_argument('--no-prescreen', action='store_true', help='Download every PDF in full without a Range probe')
+    parser.add_argument('--export', choices=('jsonl-gzip', 'jsonl-zstd', 'parquet'), help='Also write the compressed export')
+    parser.add_argument('--search-index', action='store_true', help='Build the full-text index and time a sample query')
+    parser.add_argument('--output-mode', choices=('inline', 'normalized'), default='inline')
+    parser.add_argument('--memory-mb', type=int, help='Memory budget for the RSS governor')
+    parser.add_argument('--profile', help='site_profile JSON (its base_url is replaced by the stand-in)')
+    parser.add_argument('--corpus', help='Recorded corpus directory for the stand-in')
+    args = parser.parse_args()
+    if args.profile:
+        with open(args.profile) as f:
+            args.profile = json.load(f)
+
+    storage = tempfile.mkdtemp(prefix='mrpl-bench-storage-')
+    os.environ['CRAWLEE_STORAGE_DIR'] = storage
+    os.environ.setdefault('APIFY_LOG_LEVEL', 'WARNING')
+    # requests lets these override session.verify=False, which breaks --tls with the self-signed cert
+    for name in ('REQUESTS_CA_BUNDLE', 'CURL_CA_BUNDLE'):
+        os.environ.pop(name, None)
+
+    port = free_port()
+    server = start_standin(args, port)
+    base_url = f"{'https' if args.tls else 'http'}://127.0.0.1:{port}"
+    try:
+        scraper, pages, elapsed = asyncio.run(run_crawl(args, base_url))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(storage, ignore_errors=True)
+
+    summary = scraper.metrics.summary()
+    stages = summary['stages']
+    counters = summary['counters']
+    pdfs = stages.get('pdf_parse', {}).get('count', 0)
+    print(f"Base URL: {base_url}  concurrency={args.concurrency}  latency={args.latency}s  error_rate={args.error_rate}")
+    print(f"Pages scraped: {pages} in {elapsed:.2f}s -> {pages / elapsed:.2f} pages/s")
+    print(f"PDFs parsed:   {pdfs} -> {pdfs / elapsed:.2f} PDFs/s  (queue: {scraper.pdf_queue.stats}, {scraper.pdf_queue.bytes_used / 1024 / 1024:.1f}MB)")
+    print(f"PDF bytes: {counters.get('bytes_pdf', 0) / 1024 / 1024:.1f}MB downloaded, {counters.get('bytes_pdf_probe', 0) / 1024:.0f}KB probed, "
+          f"pre-screen: {scraper.pdf_screen.stats}")
+    print(f"Requests: {counters.get('requests', 0)}, retries: {counters.get('retries', 0)}, failed pages: {counters.get('pages_failed', 0)}, "
+          f"near-duplicates: {counters.get('pages_near_duplicate', 0)}, memory throttles: {counters.get('memory_throttled', 0)}, "
+          f"sitemap URLs queued: {counters.get('sitemap_urls_queued', 0)}")
+    if scraper.exporter is not None:
+        sizes = scraper.exporter.sizes()
+        print(f"Export ({scraper.exporter.format}): metadata {sizes['meta'] / 1024:.1f}KB, text {sizes['text'] / 1024:.1f}KB, "
+              f"dataset JSON {counters.get('bytes_dataset', 0) / 1024:.1f}KB")
+    if args.search_index:
+        from main import SearchIndex
+        index = SearchIndex.from_bytes(scraper.search_index_saved)
+        started = time.perf_counter()
+        hits = index.search('tender', limit=10)
+        query_ms = (time.perf_counter() - started) * 1000
+        print(f"Search index: {scraper.search_index.stats}, {len(index)} documents, {len(scraper.search_index_saved) / 1024:.1f}KB stored, "
+              f"query 'tender': {len(hits)} hits in {query_ms:.1f}ms")
+    print(f"{'stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for stage, stats in sorted(stages.items()):
+        print(f"{stage:<16}{stats['count']:>7}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['mean_ms']:>10.1f}")
+
+    # ru_maxrss is KiB on Linux; children covers the PDF worker processes after they exit
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"Peak RSS: scraper {own:.1f} MiB, largest child process (PDF workers, stand-in) {children:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
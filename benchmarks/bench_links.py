@@ -0,0 +1,109 @@
+"""Micro-benchmark: link extraction per page, old per-anchor loop vs LinkExtractor.
+
+Usage:
+    python benchmarks/bench_links.py [PAGES_DIR] [--anchors 5000] [--repeat N]
+
+PAGES_DIR holds saved MRPL pages (*.html). Without one, bench_parse's synthetic
+pages are used plus a tenders listing with --anchors rows, each linking the
+tender twice (number and title) and its notice PDF. hrefs are parsed once up
+front; only link handling is timed. "cold" starts from an empty cache for
+every page, "warm" reuses the cache as a crawl does, so the navigation repeated
+on every page is resolved once.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_parse import load_pages, synthetic_pages  # noqa: E402
+from main import LinkExtractor, PageParser, SiteProfile  # noqa: E402
+
+PAGE_URL = 'https://mrpl.co.in/en/Tenders'
+
+
+def tenders_listing(anchors):
+    """Tenders table with ``anchors`` rows: detail link twice, a fragment link and the notice PDF"""
+    rows = ''.join(
+        f'<tr><td><a href="/Tender/Details/{i}">{i}</a></td><td><a href="../Tender/Details/{i}#top">MRPL/T/{i}</a></td>'
+        f'<td><a href="/uploads/tenders/T{i}.pdf">Notice</a></td><td><a href="#filters">Filter</a></td></tr>'
+        for i in range(anchors)
+    )
+    nav = ''.join(f'<li><a href="/Parent/Section_{i}">Section {i}</a></li>' for i in range(60))
+    return (f'<html><head><title>Tenders - MRPL</title></head><body><ul>{nav}</ul><table>{rows}</table>'
+            f'<a href="https://www.facebook.com/mrpl">Facebook</a><a href="mailto:tenders@mrpl.co.in">Mail</a></body></html>').encode('utf-8')
+
+
+def legacy_links(profile, base_url, url, hrefs):
+    """The per-anchor loop the scraper used before LinkExtractor"""
+    internal_links, external_links, pdf_links = [], [], []
+    for href in hrefs:
+        if href:
+            if href.startswith('/'):
+                absolute_url = base_url + href
+            elif href.startswith('http'):
+                absolute_url = href
+            else:
+                absolute_url = requests.compat.urljoin(url, href)
+
+            if href.lower().endswith('.pdf'):
+                pdf_links.append(absolute_url)
+            elif profile.is_internal(absolute_url):
+                internal_links.append(absolute_url)
+            elif href.startswith('http'):
+                external_links.append(absolute_url)
+    return internal_links, external_links, pdf_links
+
+
+def time_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pages_dir', nargs='?', help='Directory of saved *.html pages')
+    parser.add_argument('--anchors', type=int, default=5000, help='Rows in the synthetic tenders listing')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.pages_dir:
+        pages = load_pages(args.pages_dir)
+        if not pages:
+            sys.exit(f"No .html pages found in {args.pages_dir}")
+    else:
+        pages = dict(synthetic_pages(), **{'tenders_listing.html': tenders_listing(args.anchors)})
+
+    profile = SiteProfile.from_input()
+    page_parser = PageParser(profile.content_selectors)
+    warm = LinkExtractor(profile)
+    print(f"{'page':<24}{'anchors':>9}{'old links':>11}{'new links':>11}{'old ms':>9}{'cold ms':>9}{'warm ms':>9}{'speedup':>9}")
+    totals = [0.0, 0.0, 0.0]
+    for name, content in pages.items():
+        hrefs = page_parser.parse(content)['hrefs']
+        old = legacy_links(profile, profile.base_url, PAGE_URL, hrefs)
+        new = warm.extract(PAGE_URL, hrefs)
+        old_ms = time_ms(lambda: legacy_links(profile, profile.base_url, PAGE_URL, hrefs), args.repeat)
+        cold_ms = time_ms(lambda: LinkExtractor(profile).extract(PAGE_URL, hrefs), args.repeat)
+        warm_ms = time_ms(lambda: warm.extract(PAGE_URL, hrefs), args.repeat)
+        totals[0] += old_ms
+        totals[1] += cold_ms
+        totals[2] += warm_ms
+        print(f"{name[:23]:<24}{len(hrefs):>9}{sum(map(len, old)):>11}{sum(map(len, new)):>11}"
+              f"{old_ms:>9.2f}{cold_ms:>9.2f}{warm_ms:>9.2f}{old_ms / warm_ms:>8.1f}x")
+    print(f"{'total':<24}{'':>31}{totals[0]:>9.2f}{totals[1]:>9.2f}{totals[2]:>9.2f}{totals[0] / totals[2]:>8.1f}x")
+    print(f"Cache: {warm.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Micro-benchmark: per-page HTML extraction time, BeautifulSoup chain vs single-pass lxml.
+
+Usage:
+    python benchmarks/bench_parse.py [PAGES_DIR] [--repeat N]
+
+PAGES_DIR holds saved MRPL pages (*.html). Without one, a few synthetic
+MRPL-shaped pages are generated, including a tenders listing with thousands
+of anchors. Both parsers must return the same title, description, content and
+hrefs; mismatches are reported.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from main import PageParser  # noqa: E402
+
+
+def synthetic_pages():
+    """MRPL-like pages: home, a content page and a large tenders listing"""
+    nav = ''.join(f'<li><a href="/Parent/Section_{i}">Section {i}</a></li>' for i in range(60))
+    head = '<head><meta charset="utf-8"><title>{title}</title><meta name="description" content="Mangalore Refinery and Petrochemicals Limited"><script>var x = 1;</script><style>.a{{}}</style></head>'
+    
+    def page(title, body):
+        return (f'<!DOCTYPE html><html>{head.format(title=title)}<body><header><ul class="nav">{nav}</ul></header>'
+                f'<div class="container"><div class="main-content">{body}</div></div>'
+                f'<footer><a href="https://www.facebook.com/mrpl">Facebook</a></footer></body></html>').encode('utf-8')
+    
+    home = page('MRPL - Home', ''.join(f'<p>News item {i} about refinery operations and CSR.</p>' for i in range(40)))
+    about = page('About Us - MRPL', '<h1>About Us</h1>' + '<p>MRPL is a Schedule A Miniratna company. </p>' * 200)
+    rows = ''.join(
+        f'<tr><td>{i}</td><td><a href="/Tender/Details/{i}">Tender MRPL/T/{i}</a></td>'
+        f'<td><a href="/uploads/tenders/T{i}.pdf">Notice</a></td><td>2024-01-{i % 28 + 1:02d}</td></tr>'
+        for i in range(1500)
+    )
+    tenders = page('Tenders - MRPL', f'<table class="table">{rows}</table>')
+    return {'home.html': home, 'about.html': about, 'tenders.html': tenders}
+
+
+def load_pages(directory):
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(('.html', '.htm')):
+            with open(os.path.join(directory, name), 'rb') as f:
+                pages[name] = f.read()
+    return pages
+
+
+def normalized(result):
+    return (result['title'], result['description'], ' '.join(result['content'].split()), result['hrefs'])
+
+
+def time_per_page(func, content, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(content)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pages_dir', nargs='?', help='Directory of saved *.html pages')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    
+    pages = load_pages(args.pages_dir) if args.pages_dir else synthetic_pages()
+    if not pages:
+        sys.exit(f"No .html pages found in {args.pages_dir}")
+    
+    page_parser = PageParser()
+    print(f"{'page':<28}{'bytes':>10}{'anchors':>9}{'soup ms':>10}{'lxml ms':>10}{'speedup':>9}  parity")
+    totals = [0.0, 0.0]
+    mismatches = 0
+    for name, content in pages.items():
+        before = page_parser.parse_soup(content)
+        after = page_parser.parse(content)
+        same = normalized(before) == normalized(after)
+        mismatches += not same
+        
+        soup_ms = time_per_page(page_parser.parse_soup, content, args.repeat)
+        lxml_ms = time_per_page(page_parser.parse, content, args.repeat)
+        totals[0] += soup_ms
+        totals[1] += lxml_ms
+        print(f"{name[:27]:<28}{len(content):>10}{len(after['hrefs']):>9}{soup_ms:>10.2f}{lxml_ms:>10.2f}{soup_ms / lxml_ms:>8.1f}x  {'ok' if same else 'DIFF'}")
+    
+    print(f"{'total':<47}{totals[0]:>10.2f}{totals[1]:>10.2f}{totals[0] / totals[1]:>8.1f}x")
+    if mismatches:
+        print(f"{mismatches} page(s) extracted differently")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Micro-benchmark: PDF text extraction, full 20-page pdfplumber parse vs budgeted page-by-page extraction.
+
+Usage:
+    python benchmarks/bench_pdf.py [PDF ...] [--max-chars 5000] [--max-pages 20] [--repeat N]
+
+Without PDFs, synthetic documents of 5, 120 and 400 pages are generated with
+the stand-in's PDF writer. The baseline reproduces the old extraction: every
+page up to 20 through pdfplumber, joined, whitespace-collapsed and then cut to
+the budget. Both must yield the same leading text.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import pdfplumber  # noqa: E402
+
+from main import _open_pdf_source, extract_pdf_document  # noqa: E402
+from mrpl_standin import make_pdf  # noqa: E402
+
+
+def baseline(pdf_source, max_chars, max_pages):
+    with _open_pdf_source(pdf_source) as pdf_file:
+        with pdfplumber.open(pdf_file) as pdf:
+            text = '\n'.join(filter(None, (page.extract_text() for page in pdf.pages[:max_pages])))
+    return ' '.join(text.split())[:max_chars]
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return result, statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdfs', nargs='*')
+    parser.add_argument('--max-chars', type=int, default=5000)
+    parser.add_argument('--max-pages', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.pdfs:
+        documents = {os.path.basename(path): path for path in args.pdfs}
+    else:
+        line = 'Mangalore Refinery and Petrochemicals annual report crude throughput and refinery margins. ' * 3
+        documents = {f'synthetic_{n}p.pdf': make_pdf([f'Page {p}. {line}' for p in range(n)]) for n in (5, 120, 400)}
+
+    print(f"{'document':<24}{'baseline ms':>13}{'budgeted ms':>13}{'speedup':>9}  method, pages read")
+    for name, source in documents.items():
+        expected, old_ms = timed(lambda: baseline(source, args.max_chars, args.max_pages), args.repeat)
+        parsed, new_ms = timed(lambda: extract_pdf_document(source, args.max_chars, args.max_pages), args.repeat)
+        text = (parsed['text'] or '')[:args.max_chars]
+        print(f"{name:<24}{old_ms:>13.1f}{new_ms:>13.1f}{old_ms / new_ms:>8.1f}x  {parsed['method']}, {parsed['pages']}")
+        if text != expected:
+            # Different backends may space words differently; report rather than fail
+            print(f"  note: text differs from pdfplumber output ({len(text)} vs {len(expected)} chars)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+"""Local stand-in for mrpl.co.in: serves a page/PDF corpus with configurable latency, errors and TLS.
+
+Usage:
+    python benchmarks/mrpl_standin.py [--corpus DIR] [--port 8443] [--latency 0.05]
+                                      [--error-rate 0.0] [--tls]
+
+--corpus points at a recorded mirror of the site (URL path -> file, with
+'/x/' served from 'x/index.html' and '/x' from 'x' or 'x.html'). Without it a
+synthetic MRPL-shaped corpus is generated into a temp directory: a home page,
+section pages, a tenders listing, multi-page text PDFs and scanned image-only
+tender PDFs, plus robots.txt, a
+sitemap index (one plain and one gzipped sitemap, with lastmod) and a tenders
+RSS feed linked from the home page.
+"""
+import argparse
+import gzip
+import os
+import random
+import re
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+def make_pdf(pages_text):
+    """Minimal valid PDF with one line of Helvetica text per page"""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>']
+    kids = ' '.join(f'{4 + 2 * i} 0 R' for i in range(len(pages_text)))
+    objects.append(f'<< /Type /Pages /Kids [{kids}] /Count {len(pages_text)} >>'.encode())
+    objects.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+    for i, text in enumerate(pages_text):
+        text = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        stream = f'BT /F1 10 Tf 40 760 Td ({text}) Tj ET'.encode('latin-1', 'replace')
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>'.encode()
+        )
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+    return assemble_pdf(objects)
+
+
+def make_scanned_pdf(pages, image_bytes, rng):
+    """Image-only PDF like a scanner produces: one full-page JPEG per page and no fonts"""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>']
+    kids = ' '.join(f'{4 + 3 * i} 0 R' for i in range(pages))
+    objects.append(f'<< /Type /Pages /Kids [{kids}] /Count {pages} >>'.encode())
+    objects.append(b'<< /Producer (Canon iR-ADV C5535 PDF scanner) >>')
+    for i in range(pages):
+        stream = b'q 612 0 0 792 0 0 cm /Im0 Do Q'
+        image = rng.randbytes(image_bytes)
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            f'/Resources << /XObject << /Im0 {6 + 3 * i} 0 R >> >> /Contents {5 + 3 * i} 0 R >>'.encode()
+        )
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        objects.append(
+            b'<< /Type /XObject /Subtype /Image /Width 2480 /Height 3508 /ColorSpace /DeviceGray '
+            b'/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>\nstream\n' % len(image) + image + b'\nendstream'
+        )
+    return assemble_pdf(objects, info=3)
+
+
+def assemble_pdf(objects, info=None):
+    """Serialise numbered objects (1-based) with an xref table and trailer"""
+    out = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    out += b''.join(f'{offset:010d} 00000 n \n'.encode() for offset in offsets)
+    info = f' /Info {info} 0 R' if info else ''
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R{info} >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return out
+
+
+def generate_corpus(directory, sections=40, tenders=300, pdfs=12, scans=6, seed=7):
+    """Write a synthetic MRPL-shaped site into `directory`"""
+    rng = random.Random(seed)
+    words = ('refinery crude throughput tender notice procurement contract petrochemical '
+             'Mangalore MRPL annual report board directors dividend sustainability CSR '
+             'polypropylene aromatic complex shareholders disclosure bid').split()
+
+    def sentence(n=12):
+        return ' '.join(rng.choice(words) for _ in range(n)).capitalize() + '.'
+
+    def write(path, data):
+        full = os.path.join(directory, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, 'wb') as f:
+            f.write(data if isinstance(data, bytes) else data.encode('utf-8'))
+
+    pdf_paths = [f'uploads/docs/document_{i}.pdf' for i in range(pdfs)]
+    for i, path in enumerate(pdf_paths):
+        page_count = (5, 30, 120)[i % 3]
+        write(path, make_pdf([f'MRPL document {i} page {p}. ' + sentence(20) for p in range(page_count)]))
+
+    # Scanned tender documents: megabytes of page images and no text layer
+    scan_paths = [f'uploads/scans/tender_scan_{i}.pdf' for i in range(scans)]
+    for path in scan_paths:
+        write(path, make_scanned_pdf(4, 512 * 1024, rng))
+
+    section_paths = [f'Content/Section_{i}' for i in range(sections)]
+    nav = ''.join(f'<li><a href="/{path}">Section {i}</a></li>' for i, path in enumerate(section_paths[:25]))
+    nav += '<li><a href="/en/tenders">Tenders</a></li><li><a href="/en/investors">Investors</a></li>'
+
+    def page(title, body, head=''):
+        return (
+            f'<!DOCTYPE html><html><head><meta charset="utf-8">{head}'
+            f'<title>{title}</title><meta name="description" content="Mangalore Refinery and Petrochemicals Limited - {title}">'
+            '<script>window.dataLayer = [];</script></head><body>'
+            f'<header><ul class="nav">{nav}</ul></header>'
+            f'<div class="container"><div class="main-content">{body}</div></div>'
+            '<footer><a href="https://twitter.com/mrpl">Twitter</a> Mangalore Refinery</footer></body></html>'
+        )
+
+    feed_link = '<link rel="alternate" type="application/rss+xml" title="Tenders" href="/en/tenders.rss">'
+    write('en/index.html', page('MRPL - Home', ''.join(f'<p>{sentence()}</p>' for _ in range(30)), feed_link))
+    for i, path in enumerate(section_paths):
+        links = ''.join(f'<a href="/{rng.choice(section_paths)}">Related</a> ' for _ in range(5))
+        docs = ''.join(f'<a href="/{rng.choice(pdf_paths)}">Download PDF</a> ' for _ in range(i % 4))
+        body = ''.join(f'<p>{sentence(30)}</p>' for _ in range(15))
+        if i % 5 == 0:
+            # Near-duplicates like the real site's print views and language copies
+            links += f'<a href="/{path}_print">Print</a> <a href="/hi/{path}">Hindi</a> '
+            write(path + '_print.html', page(f'Section {i} - MRPL (print)', body + f'<p>Printed on {sentence(3)}</p>'))
+            write('hi/' + path + '.html', page(f'Section {i} - MRPL', body))
+        write(path + '.html', page(f'Section {i} - MRPL', body + links + docs))
+
+    rows = ''.join(
+        f'<tr><td>{i}</td><td><a href="/Tender/Details_{i}">Tender MRPL/T/{i}</a></td>'
+        f'<td><a href="/{pdf_paths[i % len(pdf_paths)]}">Notice</a></td></tr>'
+        for i in range(tenders)
+    )
+    write('en/tenders.html', page('Tenders - MRPL', f'<table class="table">{rows}</table>'))
+    for i in range(tenders):
+        scan = f'<a href="/{scan_paths[i // 10 % len(scan_paths)]}">Scanned copy</a>' if i % 10 == 0 else ''
+        write(f'Tender/Details_{i}.html', page(f'Tender {i} - MRPL', f'<p>{sentence(40)}</p><a href="/{pdf_paths[i % len(pdf_paths)]}">Tender document</a>{scan}'))
+    write('en/investors.html', page('Investors - MRPL', ''.join(f'<a href="/{path}">Annual report</a> ' for path in pdf_paths)))
+    
+    # Sitemaps list the canonical host, like the real site's; ages spread from today to two years back
+    now = datetime.now(timezone.utc)
+    ages = {path: rng.randrange(730) for path in section_paths + [f'Tender/Details_{i}' for i in range(tenders)]}
+    
+    def urlset(paths):
+        urls = ''.join(
+            f'<url><loc>https://mrpl.co.in/{path}</loc><lastmod>{(now - timedelta(days=ages[path])).date().isoformat()}</lastmod></url>'
+            for path in paths
+        )
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+    
+    write('sitemap-pages.xml', urlset(section_paths))
+    write('sitemap-tenders.xml.gz', gzip.compress(urlset(f'Tender/Details_{i}' for i in range(tenders)).encode('utf-8')))
+    write('sitemap_index.xml', (
+        '<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        '<sitemap><loc>https://mrpl.co.in/sitemap-pages.xml</loc></sitemap>'
+        '<sitemap><loc>https://mrpl.co.in/sitemap-tenders.xml.gz</loc></sitemap></sitemapindex>'
+    ))
+    write('robots.txt', 'User-agent: *\nDisallow: /admin/\nSitemap: https://mrpl.co.in/sitemap_index.xml\n')
+    
+    newest = sorted(range(tenders), key=lambda i: ages[f'Tender/Details_{i}'])[:20]
+    items = ''.join(
+        f'<item><title>Tender MRPL/T/{i}</title><link>https://mrpl.co.in/Tender/Details_{i}</link>'
+        f'<pubDate>{format_datetime(now - timedelta(days=ages[f"Tender/Details_{i}"]))}</pubDate></item>'
+        for i in newest
+    )
+    write('en/tenders.rss', f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>MRPL Tenders</title>'
+                            f'<link>https://mrpl.co.in/en/tenders</link>{items}</channel></rss>')
+    return directory
+
+
+def self_signed_context(directory):
+    """Server SSL context with a throwaway self-signed certificate (the scraper does not verify)"""
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-subj', '/CN=localhost', '-keyout', key, '-out', cert],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+def make_handler(corpus, latency, error_rate):
+    class StandInHandler(SimpleHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=corpus, **kwargs)
+
+        def _resolve(self):
+            """Map the request path onto a corpus file the way the recorded mirror is laid out"""
+            parts = urlsplit(self.path)
+            path = parts.path
+            candidates = [path + 'index.html'] if path.endswith('/') else [path, path + '.html', path + '/index.html']
+            for candidate in candidates:
+                if os.path.isfile(os.path.join(corpus, candidate.lstrip('/'))):
+                    self.path = candidate
+                    return
+
+        def _delay_or_fail(self):
+            if latency:
+                time.sleep(latency * random.uniform(0.5, 1.5))
+            if error_rate and random.random() < error_rate:
+                self.send_response(503)
+                self.send_header('Retry-After', '1')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return True
+            return False
+
+        def _send_range(self):
+            """Answer a single-range 'Range: bytes=a-b' / 'bytes=-n' request with 206; False if not applicable"""
+            match = re.fullmatch(r'bytes=(\d*)-(\d*)', self.headers.get('Range', '').strip())
+            path = self.translate_path(self.path)
+            if not match or not any(match.groups()) or not os.path.isfile(path):
+                return False
+            size = os.path.getsize(path)
+            first, last = match.groups()
+            if first:
+                start, end = int(first), min(int(last), size - 1) if last else size - 1
+            else:
+                start, end = max(0, size - int(last)), size - 1
+            if start >= size or start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return True
+            with open(path, 'rb') as f:
+                f.seek(start)
+                data = f.read(end - start + 1)
+            self.send_response(206)
+            self.send_header('Content-Type', self.guess_type(path))
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return True
+
+        def do_GET(self):
+            if not self._delay_or_fail():
+                self._resolve()
+                if not self._send_range():
+                    super().do_GET()
+
+        def do_HEAD(self):
+            if not self._delay_or_fail():
+                self._resolve()
+                super().do_HEAD()
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandInHandler
+
+
+def serve(corpus, port, latency=0.0, error_rate=0.0, tls=False, host='127.0.0.1'):
+    server = ThreadingHTTPServer((host, port), make_handler(corpus, latency, error_rate))
+    server.daemon_threads = True
+    if tls:
+        server.socket = self_signed_context(tempfile.mkdtemp(prefix='mrpl-standin-tls-')).wrap_socket(server.socket, server_side=True)
+    print(f"Serving {corpus} on {'https' if tls else 'http'}://{host}:{port} (latency={latency}s, error_rate={error_rate})", flush=True)
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', help='Recorded corpus directory (default: generate a synthetic one)')
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--latency', type=float, default=0.05, help='Mean per-request latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--tls', action='store_true', help='Serve HTTPS with a self-signed certificate')
+    args = parser.parse_args()
+
+    corpus = args.corpus
+    cleanup = None
+    if not corpus:
+        corpus = cleanup = generate_corpus(tempfile.mkdtemp(prefix='mrpl-corpus-'))
+    try:
+        serve(corpus, args.port, args.latency, args.error_rate, args.tls)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if cleanup:
+            shutil.rmtree(cleanup, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
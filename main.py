@@ -1,15 +1,34 @@
 import asyncio
 import os
 import sys
-from apify import Actor
+from apify import Actor, Event
 import requests
 from bs4 import BeautifulSoup
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import ssl
 import urllib3
 import io
+import gzip
+import json
+import sqlite3
+import heapq
+import random
+import re
 import tempfile
+import functools
+import hashlib
+import threading
+import zlib
+from contextlib import contextmanager
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from dataclasses import dataclass, field
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from email.utils import parsedate_to_datetime
+from xml.etree import ElementTree
 
 # PDF processing imports
 try:
@@ -24,14 +43,2414 @@ try:
 except ImportError:
     PDFPLUMBER_AVAILABLE = False
 
+# Fast text-layer extraction (installed alongside recent pdfplumber releases)
+try:
+    import pypdfium2
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+# Fast HTML parsing
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Resident memory of the whole process tree (falls back to /proc or getrusage)
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Optional export codecs; gzip JSON Lines needs nothing extra
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
 # Disable SSL warnings globally
 urllib3.disable_warnings()
 
+# PDF download limits
+PDF_MAX_BYTES = 50 * 1024 * 1024  # Abort downloads past 50MB, with or without content-length
+PDF_SPOOL_BYTES = 2 * 1024 * 1024  # Larger PDFs are spilled to a temp file instead of memory
+PDF_CHUNK_BYTES = 64 * 1024
+
+# PDF pre-screen: bytes read from the start and end of a document, and the size past which a
+# document whose text layer could not be confirmed waits until the other PDFs are done
+PDF_PROBE_BYTES = 64 * 1024
+PDF_TAIL_BYTES = 16 * 1024
+PDF_DEFER_BYTES = 10 * 1024 * 1024
+
+# Default PDF text budget: extraction stops once either limit is reached
+PDF_MAX_CHARS = 5000
+PDF_MAX_PAGES = 20
+
+# Sitemap/feed discovery limits: documents read per run, entries kept per document (the sitemap protocol's own cap)
+FEED_MAX_DOCUMENTS = 20
+FEED_MAX_ENTRIES = 50000
+
+# Main content is taken from the first selector that matches
+CONTENT_SELECTORS = [
+    '.main-content', '.content', 'main', '.page-content', 'article', '.container', 'body'
+]
+
+# The MRPL site; the site_profile input overrides any of these keys
+DEFAULT_SITE_PROFILE = {
+    'base_url': 'https://mrpl.co.in',
+    'home_path': '/en/',
+    'domains': ['mrpl.co.in'],
+    'seeds': [
+        '/en/', '/en/about-us', '/en/products', '/en/media-center', '/en/careers', '/en/investors', '/en/csr',
+        '/en/tenders', '/Parent/About_us', '/Content/Vision_and_Mission', '/Parent/Organization', '/Content/History'
+    ],
+    'content_selectors': CONTENT_SELECTORS,
+    'include': [],
+    'exclude': [],
+    'section_limits': {},
+    'keywords': ['mrpl', 'mangalore'],
+    'sitemaps': [],
+    'feeds': []
+}
+
+class HostRateLimiter:
+    """Per-host token bucket with optional adaptive (AIMD) rate control.
+
+    Each host gets ``burst`` tokens refilled at ``requests_per_second``. In
+    adaptive mode the rate is halved on 429/5xx/connection errors or when
+    latency climbs well above the host's baseline, and creeps back up to the
+    configured ceiling while responses stay healthy.
+    """
+    
+    MIN_RATE = 0.05  # Never slower than one request every 20s
+    
+    def __init__(self, requests_per_second=0.5, burst=1, adaptive=True):
+        self.max_rate = max(float(requests_per_second), self.MIN_RATE)
+        self.burst = max(1, int(burst))
+        self.adaptive = adaptive
+        self._hosts = {}
+    
+    def _bucket(self, url):
+        host = urlsplit(url).hostname or ''
+        bucket = self._hosts.get(host)
+        if bucket is None:
+            bucket = {
+                'rate': self.max_rate,
+                'tokens': float(self.burst),
+                'updated': time.monotonic(),
+                'latency': None,  # EWMA of response time
+                'baseline': None,  # Best EWMA seen, the "healthy" latency
+                'cooldown_until': 0.0,
+                'throttled': 0
+            }
+            self._hosts[host] = bucket
+        return bucket
+    
+    async def acquire(self, url):
+        """Wait until a token is available for the URL's host"""
+        bucket = self._bucket(url)
+        now = time.monotonic()
+        bucket['tokens'] = min(self.burst, bucket['tokens'] + (now - bucket['updated']) * bucket['rate'])
+        bucket['updated'] = now
+        
+        # Reserve a token up front so concurrent callers queue behind each other
+        bucket['tokens'] -= 1
+        if bucket['tokens'] < 0:
+            await asyncio.sleep(-bucket['tokens'] / bucket['rate'])
+    
+    def record(self, url, status_code, latency=None, retry_after=None):
+        """Feed a response outcome back into the host's adaptive rate.
+
+        ``status_code`` is None for connection errors; ``latency`` may be None
+        for transfers whose duration says nothing about server load (PDFs).
+        """
+        if not self.adaptive:
+            return
+        
+        bucket = self._bucket(url)
+        slow = False
+        if latency is not None:
+            if bucket['latency'] is None:
+                bucket['latency'] = latency
+            else:
+                bucket['latency'] = 0.8 * bucket['latency'] + 0.2 * latency
+            if bucket['baseline'] is None or bucket['latency'] < bucket['baseline']:
+                bucket['baseline'] = bucket['latency']
+            slow = bucket['latency'] > 2 * bucket['baseline'] + 0.5
+        
+        overloaded = status_code is None or status_code == 429 or status_code >= 500
+        now = time.monotonic()
+        
+        if retry_after:
+            # Drain the bucket so nothing goes out before the server asked
+            bucket['tokens'] = min(bucket['tokens'], -retry_after * bucket['rate'])
+        
+        if overloaded or slow:
+            # Back off at most once per refill interval so one burst of errors does not collapse the rate
+            if now >= bucket['cooldown_until']:
+                bucket['rate'] = max(self.MIN_RATE, bucket['rate'] * 0.5)
+                bucket['cooldown_until'] = now + 1.0 / bucket['rate']
+                bucket['throttled'] += 1
+                Actor.log.warning(f"🐢 Slowing down {urlsplit(url).hostname} to {bucket['rate']:.2f} req/s (status={status_code})")
+        elif bucket['rate'] < self.max_rate:
+            bucket['rate'] = min(self.max_rate, bucket['rate'] + 0.1 * self.max_rate)
+    
+    def stats(self):
+        """Current per-host rate and throttle counts"""
+        return {
+            host: {'rate': round(bucket['rate'], 3), 'throttled': bucket['throttled']}
+            for host, bucket in self._hosts.items()
+        }
+
+
+def normalize_url(url):
+    """Canonical form of a URL for cache and dedup keys.
+
+    Lowercases scheme and host, drops default ports and fragments and keeps
+    path and query as-is.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+def crawl_key(url):
+    """Dedup key for crawl pages: normalize_url minus the scheme, trailing slash and /en/ prefix.
+
+    http/https, 'x' vs 'x/' and '/en/x' vs '/x' all serve the same MRPL page.
+    """
+    parts = urlsplit(normalize_url(url))
+    path = parts.path
+    if path == '/en' or path.startswith('/en/'):
+        path = path[3:] or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+    return f"{parts.netloc}{path}?{parts.query}" if parts.query else f"{parts.netloc}{path}"
+
+
+class SiteProfile:
+    """Everything site-specific about a crawl, compiled once into fast matchers.
+
+    Built from a plain dict (the ``site_profile`` input) layered over
+    DEFAULT_SITE_PROFILE:
+
+    - ``base_url``, ``home_path``: site root and the page discovery starts from
+    - ``domains``: hosts treated as internal (subdomains included); the
+      base URL's host always is
+    - ``seeds``: start paths or URLs, used when discovery finds nothing
+    - ``content_selectors``: main-content selectors, first match wins
+    - ``include`` / ``exclude``: regexes searched in each URL's path and
+      query; a URL must match an include (when any are given) and no exclude
+    - ``section_limits``: {path prefix: max pages}, longest prefix wins
+    - ``keywords``: words a real home page must contain
+    - ``sitemaps`` / ``feeds``: sitemap and RSS/Atom paths or URLs read at
+      discovery, on top of robots.txt and feeds linked from the home page
+    """
+    
+    def __init__(self, base_url='https://mrpl.co.in', home_path='/en/', domains=(), seeds=(),
+                 content_selectors=None, include=(), exclude=(), section_limits=None, keywords=(),
+                 sitemaps=(), feeds=()):
+        self.base_url = base_url.rstrip('/')
+        self.home_path = '/' + home_path.lstrip('/')
+        base_host = (urlsplit(self.base_url).hostname or '').lower()
+        self.domains = frozenset({base_host} | {domain.lower().lstrip('.') for domain in domains})
+        self._domain_suffixes = tuple('.' + domain for domain in self.domains)
+        self.seeds = list(seeds)
+        self.content_selectors = list(content_selectors or CONTENT_SELECTORS)
+        self.keywords = [keyword.lower().encode('utf-8') for keyword in keywords]
+        self._include = self._compile(include)
+        self._exclude = self._compile(exclude)
+        self.section_limits = dict(section_limits or {})
+        prefixes = sorted(self.section_limits, key=len, reverse=True)
+        self._sections = re.compile('|'.join(map(re.escape, prefixes))) if prefixes else None
+        self.sitemaps = list(sitemaps)
+        self.feeds = list(feeds)
+    
+    @staticmethod
+    def _compile(patterns):
+        """One alternation regex for a list of patterns (None when empty)"""
+        patterns = list(patterns or ())
+        return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns)) if patterns else None
+    
+    @classmethod
+    def from_input(cls, profile=None, base_url=None):
+        """Profile from an input dict over the defaults; an explicit base_url wins over both"""
+        settings = dict(DEFAULT_SITE_PROFILE, **(profile or {}))
+        if base_url:
+            settings['base_url'] = base_url
+        unknown = set(settings) - set(DEFAULT_SITE_PROFILE)
+        if unknown:
+            raise ValueError(f"Unknown site_profile keys: {', '.join(sorted(unknown))}")
+        return cls(**settings)
+    
+    def is_internal(self, url):
+        host = (urlsplit(url).hostname or '').lower()
+        return host in self.domains or host.endswith(self._domain_suffixes)
+    
+    def allows(self, url):
+        """Whether the include/exclude patterns let ``url`` be crawled"""
+        if self._include is None and self._exclude is None:
+            return True
+        parts = urlsplit(url)
+        target = f"{parts.path}?{parts.query}" if parts.query else parts.path
+        if self._include is not None and not self._include.search(target):
+            return False
+        return self._exclude is None or not self._exclude.search(target)
+    
+    def section(self, url):
+        """Longest section_limits prefix matching the URL's path, or None"""
+        if self._sections is None:
+            return None
+        match = self._sections.match(urlsplit(url).path)
+        return match.group(0) if match else None
+    
+    def url(self, path_or_url, base_url=None):
+        """Absolute URL for a seed path, on ``base_url`` (default: the profile's)"""
+        if path_or_url.startswith(('http://', 'https://')):
+            return path_or_url
+        return (base_url or self.base_url) + '/' + path_or_url.lstrip('/')
+    
+    def home_url(self, base_url=None):
+        return self.url(self.home_path, base_url)
+    
+    def seed_urls(self, base_url=None):
+        return [self.url(seed, base_url) for seed in self.seeds]
+    
+    def looks_like_site(self, content):
+        """Content check for a probed home page (bytes)"""
+        if not self.keywords:
+            return True
+        body = content.lower()
+        return any(keyword in body for keyword in self.keywords)
+
+
+# Link targets that are files rather than pages: never queued for crawling (LinkExtractor and CrawlFrontier)
+ASSET_EXTENSION = re.compile(
+    r'\.(?:jpe?g|png|gif|bmp|svg|webp|ico|css|js|zip|rar|7z|gz|docx?|xlsx?|pptx?|csv|mp3|mp4|avi|wmv|mov)$', re.I
+)
+PDF_EXTENSION = re.compile(r'\.pdf$', re.I)
+# Tab and newline characters urljoin removes from anywhere in a URL
+URL_CONTROL_CHARS = str.maketrans('', '', '\t\r\n')
+
+
+class LinkExtractor:
+    """Turns a page's raw hrefs into deduplicated internal, external and PDF link lists.
+
+    Each href is resolved against the page, canonicalized with normalize_url
+    (fragment dropped, host lowercased, default port removed) and classified
+    by file extension (.pdf, or an asset that is not worth crawling) and by
+    host (the profile's domains, checked once per host). Resolution results
+    are cached per (base, href), where the base is only as specific as the href
+    needs: nothing for absolute URLs, the page's origin for root-relative
+    paths and the page URL itself otherwise. Navigation, footers and
+    listing pages repeat the same hrefs on every page, so most anchors
+    are a single cache lookup. Links to the page itself, non-HTTP schemes and
+    repeats are dropped.
+    """
+    
+    INTERNAL, EXTERNAL, PDF, ASSET = range(4)
+    
+    def __init__(self, profile, cache_size=100000):
+        self.profile = profile
+        self.cache_size = cache_size
+        self._cache = {}
+        self._hosts = {}
+        self.stats = {'anchors': 0, 'unique': 0, 'cache_hits': 0}
+    
+    def _is_internal(self, host):
+        internal = self._hosts.get(host)
+        if internal is None:
+            internal = self._hosts[host] = self.profile.is_internal(f"http://{host}/")
+        return internal
+    
+    def _kind(self, path, internal):
+        if PDF_EXTENSION.search(path):
+            return self.PDF
+        if not internal:
+            return self.EXTERNAL
+        return self.ASSET if ASSET_EXTENSION.search(path) else self.INTERNAL
+    
+    def _classify(self, url):
+        """(canonical URL, kind) for an absolute URL, or None when it is not an HTTP link"""
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            return None
+        return normalize_url(url), self._kind(parts.path, self._is_internal(parts.hostname))
+    
+    def extract(self, page_url, hrefs):
+        """(internal_links, external_links, pdf_links) for the hrefs found on ``page_url``"""
+        # The page URL is split once; root-relative hrefs only depend on its origin
+        parts = urlsplit(page_url)
+        origin = normalize_url(f"{parts.scheme}://{parts.netloc}").rstrip('/')
+        origin_internal = self._is_internal(parts.hostname or '')
+        own_url = normalize_url(page_url)
+        cache = self._cache
+        if len(cache) > self.cache_size:
+            cache.clear()
+        
+        links = ([], [], [], [])
+        seen = {own_url}
+        hits = 0
+        for href in hrefs:
+            href = href.strip()
+            if '\t' in href or '\n' in href or '\r' in href:
+                # Removed up front, as urljoin would, so the fast path and the cache key agree with it
+                href = href.translate(URL_CONTROL_CHARS)
+            if not href or href[0] == '#':
+                continue
+            root_relative = href[0] == '/' and not href.startswith('//')
+            if root_relative:
+                key = (origin, href)
+            elif href.startswith(('http://', 'https://')):
+                key = href
+            else:
+                key = (page_url, href)
+            
+            resolved = cache.get(key, cache)
+            if resolved is not cache:
+                hits += 1
+            else:
+                try:
+                    if root_relative and '/.' not in href:
+                        # Root-relative without dot segments: the canonical URL is the origin plus the href
+                        target = href.split('#', 1)[0]
+                        resolved = origin + target, self._kind(target.split('?', 1)[0], origin_internal)
+                    else:
+                        resolved = self._classify(urljoin(page_url, href))
+                except ValueError:
+                    resolved = None  # Malformed, e.g. a bad IPv6 host or port
+                cache[key] = resolved
+            
+            if resolved is not None and resolved[0] not in seen:
+                seen.add(resolved[0])
+                links[resolved[1]].append(resolved[0])
+        self.stats['anchors'] += len(hrefs)
+        self.stats['cache_hits'] += hits
+        self.stats['unique'] += len(seen) - 1
+        return links[self.INTERNAL], links[self.EXTERNAL], links[self.PDF]
+
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds form only)"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+class FetchClient:
+    """Rate-limited HTTP layer with retries and a per-host scheme fallback.
+
+    Runs blocking calls made with a requests.Session (``func(url, ...)``) on
+    ``executor``, at most ``max_in_flight`` at a time, each attempt behind the
+    host's rate limiter. Connection resets, timeouts, 429 and 5xx are retried
+    up to ``max_retries`` times with exponential backoff and full jitter, never
+    sooner than a Retry-After asks. A run-wide budget (``retry_ratio`` of all
+    requests, but at least ``min_retry_budget``) keeps a failing site from
+    turning into a retry storm. When HTTPS cannot connect to a host the
+    request is repeated over plain HTTP, and the scheme that worked is used
+    for every later request to that host.
+    """
+    
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+    
+    def __init__(self, session, rate_limiter, metrics=None, executor=None, max_in_flight=None,
+                 max_retries=3, backoff_base=1.0, backoff_max=30.0, retry_ratio=0.2, min_retry_budget=10):
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics or RunMetrics()
+        self.executor = executor
+        self._semaphore = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_ratio = retry_ratio
+        self.min_retry_budget = min_retry_budget
+        self._schemes = {}  # host -> scheme that connected
+        self._requests = 0
+        self._retries = 0
+    
+    def resolve(self, url):
+        """``url`` with the scheme known to work for its host"""
+        parts = urlsplit(url)
+        scheme = self._schemes.get(parts.netloc.lower())
+        if scheme and scheme != parts.scheme:
+            return urlunsplit((scheme,) + tuple(parts[1:]))
+        return url
+    
+    async def _run_blocking(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        if self._semaphore is None:
+            return await loop.run_in_executor(self.executor, call)
+        async with self._semaphore:
+            return await loop.run_in_executor(self.executor, call)
+    
+    async def _attempt(self, url, func, args, kwargs, track_latency):
+        """One paced call, with its outcome fed back into the rate limiter"""
+        with self.metrics.timer('rate_limit_wait'):
+            await self.rate_limiter.acquire(url)
+        started = time.monotonic()
+        self._requests += 1
+        self.metrics.incr('requests')
+        try:
+            result = await self._run_blocking(func, url, *args, **kwargs)
+        except Exception as e:
+            response = getattr(e, 'response', None)
+            self.metrics.incr(f"http_{response.status_code}" if response is not None else 'connection_errors')
+            self.rate_limiter.record(
+                url,
+                response.status_code if response is not None else None,
+                retry_after=parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+            )
+            raise
+        
+        status_code = getattr(result, 'status_code', 200)
+        headers = getattr(result, 'headers', {})
+        self.metrics.incr(f"http_{status_code}")
+        self.rate_limiter.record(
+            url,
+            status_code,
+            time.monotonic() - started if track_latency else None,
+            parse_retry_after(headers.get('Retry-After'))
+        )
+        return result
+    
+    def _retry_delay(self, outcome, attempt):
+        """Seconds to wait before retrying ``outcome`` (a result or exception), or None to give up"""
+        if attempt >= self.max_retries:
+            return None
+        response = getattr(outcome, 'response', None) if isinstance(outcome, Exception) else outcome
+        if response is not None and getattr(response, 'status_code', None) is not None:
+            if response.status_code not in self.RETRY_STATUSES:
+                return None
+        elif not isinstance(outcome, self.RETRY_EXCEPTIONS):
+            return None
+        
+        if self._retries >= max(self.min_retry_budget, self.retry_ratio * self._requests):
+            self.metrics.incr('retry_budget_exhausted')
+            return None
+        
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+        if retry_after:
+            if retry_after > self.backoff_max:
+                return None  # Not worth stalling a worker for
+            delay = max(delay, retry_after)
+        return delay
+    
+    async def request(self, url, func, *args, track_latency=True, **kwargs):
+        """Run ``func(url, *args, **kwargs)`` with pacing, retries and the host's working scheme"""
+        host = urlsplit(url).netloc.lower()
+        attempt = 0
+        while True:
+            target = self.resolve(url)
+            try:
+                outcome = await self._attempt(target, func, args, kwargs, track_latency)
+            except Exception as e:
+                outcome = e
+                if isinstance(e, requests.ConnectionError) and target.startswith('https://') and host not in self._schemes:
+                    fallback = 'http://' + target[len('https://'):]
+                    Actor.log.warning(f"🔄 HTTPS failed for {host}, trying HTTP: {str(e)}")
+                    try:
+                        outcome = await self._attempt(fallback, func, args, kwargs, track_latency)
+                        self._schemes[host] = 'http'
+                        Actor.log.info(f"🔗 Using HTTP for {host} from now on")
+                    except Exception:
+                        pass
+            
+            if not isinstance(outcome, Exception):
+                self._schemes.setdefault(host, urlsplit(target).scheme)
+            delay = self._retry_delay(outcome, attempt)
+            if delay is None:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+            
+            attempt += 1
+            self._retries += 1
+            self.metrics.incr('retries')
+            reason = getattr(outcome, 'status_code', None) or type(outcome).__name__
+            Actor.log.warning(f"🔁 Retry {attempt}/{self.max_retries} for {url} in {delay:.1f}s ({reason})")
+            await asyncio.sleep(delay)
+    
+    async def get(self, url, **kwargs):
+        """Non-blocking, rate-limited, retried GET through the session"""
+        return await self.request(url, self.session.get, **kwargs)
+
+
+def _open_pdf_source(pdf_source):
+    """File object for a PDF given as bytes or as a path on disk"""
+    if isinstance(pdf_source, str):
+        return open(pdf_source, 'rb')
+    return io.BytesIO(pdf_source)
+
+
+def _pdfium_pages(pdf_source, max_pages):
+    """Page texts straight from the text layer (no layout analysis)"""
+    pdf = pypdfium2.PdfDocument(pdf_source)
+    try:
+        for index in range(min(len(pdf), max_pages)):
+            page = pdf[index]
+            try:
+                textpage = page.get_textpage()
+                try:
+                    yield textpage.get_text_range()
+                finally:
+                    textpage.close()
+            finally:
+                page.close()
+    finally:
+        pdf.close()
+
+
+def _pdfplumber_pages(pdf_source, max_pages):
+    with _open_pdf_source(pdf_source) as pdf_file:
+        with pdfplumber.open(pdf_file) as pdf:
+            for page in pdf.pages[:max_pages]:
+                yield page.extract_text()
+                # Drop the page's parsed objects before moving on
+                if hasattr(page, 'close'):
+                    page.close()
+
+
+def _pypdf2_pages(pdf_source, max_pages):
+    with _open_pdf_source(pdf_source) as pdf_file:
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        for page_num in range(min(len(pdf_reader.pages), max_pages)):
+            yield pdf_reader.pages[page_num].extract_text()
+
+
+def _take_text(page_texts, max_chars):
+    """Consume page texts lazily until ``max_chars`` of whitespace-collapsed text is collected"""
+    parts = []
+    length = 0
+    pages = 0
+    with closing(page_texts):
+        for page_text in page_texts:
+            pages += 1
+            page_text = ' '.join((page_text or '').split())
+            if page_text:
+                parts.append(page_text)
+                length += len(page_text) + 1
+            if length >= max_chars:
+                break
+    return ' '.join(parts), pages
+
+
+def extract_pdf_document(pdf_source, max_chars=PDF_MAX_CHARS, max_pages=PDF_MAX_PAGES):
+    """Extract PDF text page by page, stopping at the character or page budget.
+
+    Tries the pdfium text layer first, then pdfplumber's layout analysis, then
+    PyPDF2, moving on only when a method fails or finds no text.
+    ``pdf_source`` is either the document bytes (small PDFs) or the path of a
+    spilled temp file, which every backend reads straight from disk. Runs
+    inside a PdfExtractionPool worker process, so it must stay a picklable
+    module-level function and must not touch Actor. Returns the whitespace-
+    collapsed text, the method that produced it, the pages read and any
+    per-method errors.
+    """
+    result = {'text': None, 'method': None, 'pages': 0, 'errors': []}
+    
+    methods = []
+    if PDFIUM_AVAILABLE:
+        methods.append(('pdfium', _pdfium_pages))
+    if PDFPLUMBER_AVAILABLE:
+        methods.append(('pdfplumber', _pdfplumber_pages))
+    if PDF_AVAILABLE:
+        methods.append(('PyPDF2', _pypdf2_pages))
+    
+    for method, pages in methods:
+        try:
+            text, pages_read = _take_text(pages(pdf_source, max_pages), max_chars)
+        except Exception as e:
+            result['errors'].append(f"{method} failed: {str(e)}")
+            continue
+        if text:
+            result.update(text=text, method=method, pages=pages_read)
+            return result
+    
+    return result
+
+
+PDF_FONT = re.compile(rb'/Font\b')
+PDF_IMAGE = re.compile(rb'/Subtype\s*/Image\b')
+PDF_SCAN_FILTER = re.compile(rb'/(?:CCITTFaxDecode|JBIG2Decode)\b')
+PDF_SCANNER = re.compile(
+    rb'/(?:Producer|Creator)\s*\([^)]{0,200}?(?:scan|canon|xerox|ricoh|konica|kyocera|epson|fujitsu|paperport|'
+    rb'brother|sharp|digital sending)', re.I
+)
+PDF_OBJECT_STREAM = re.compile(rb'/Type\s*/ObjStm\b[^>]*>>\s*stream\r?\n')
+
+
+def _pdf_object_streams(data):
+    """Inflated contents of the compressed object streams (/ObjStm) that start inside ``data``"""
+    inflated = []
+    for match in PDF_OBJECT_STREAM.finditer(data):
+        try:
+            # A stream cut off by the probe window still inflates up to where it stops
+            inflated.append(zlib.decompressobj().decompress(data[match.end():], PDF_PROBE_BYTES * 4))
+        except zlib.error:
+            continue
+    return b''.join(inflated)
+
+
+def screen_pdf(head, tail=b'', size=None, content_type='', complete=False):
+    """('download' | 'skip' | 'defer', reason) for a PDF from its first and last bytes.
+
+    A ``complete`` head already holds the whole document, so it always goes
+    to the parser. Otherwise looks for fonts (a text layer) in the raw
+    objects and in any object streams that begin in ``head``; page images
+    with scanner compression or a scanner as producer, and no font anywhere,
+    mark a scanned document. Large documents whose text layer could not be
+    confirmed are deferred.
+    """
+    if complete:
+        return 'download', 'read in full by the probe'
+    if 'html' in content_type.lower() or b'%PDF-' not in head[:1024]:
+        return 'skip', 'not a PDF'
+    if size and size > PDF_MAX_BYTES:
+        return 'skip', f'over {PDF_MAX_BYTES // (1024 * 1024)}MB'
+    
+    objects = head + _pdf_object_streams(head) + tail
+    if PDF_FONT.search(objects):
+        return 'download', 'text layer'
+    if PDF_IMAGE.search(objects) and (PDF_SCAN_FILTER.search(objects) or PDF_SCANNER.search(objects)):
+        return 'skip', 'scanned images without a text layer'
+    if size and size > PDF_DEFER_BYTES:
+        return 'defer', 'large, text layer not confirmed'
+    return 'download', 'text layer not confirmed'
+
+
+class _PdfTooLarge(Exception):
+    """Raised inside a streamed download once PDF_MAX_BYTES is crossed"""
+
+
+class _PdfDeferred(Exception):
+    """Raised by a PDF job to go to the back of the work queue"""
+
+
+class PdfExtractionPool:
+    """CPU-bound PDF parsing on a ProcessPoolExecutor.
+
+    Downloads hand documents over a bounded asyncio queue (so downloads stall
+    when parsing falls behind) to ``workers`` dispatcher tasks, each of which
+    runs one parse at a time in the pool. A parse that exceeds ``timeout``
+    seconds gets its worker processes killed and the pool rebuilt; other jobs
+    caught in the teardown are retried once on the fresh pool.
+    """
+    
+    def __init__(self, workers=2, timeout=60.0, queue_size=None, max_chars=PDF_MAX_CHARS, max_pages=PDF_MAX_PAGES):
+        self.workers = max(1, int(workers))
+        self.timeout = float(timeout)
+        self.max_chars = max_chars
+        self.max_pages = max_pages
+        self.queue_size = queue_size or self.workers * 2
+        self._executor = None
+        self._queue = None
+        self._dispatchers = []
+        self.timeouts = 0
+    
+    def _new_executor(self):
+        # Spawned workers do not inherit the fetch threads or open sockets
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+    
+    def _start(self):
+        self._executor = self._new_executor()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+    
+    def _restart(self):
+        """Kill every worker process (the only way to stop a runaway parse) and start a new pool"""
+        old = self._executor
+        for process in list((getattr(old, '_processes', None) or {}).values()):
+            process.kill()
+        old.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._new_executor()
+    
+    async def _run(self, pdf_content):
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(executor, extract_pdf_document, pdf_content, self.max_chars, self.max_pages),
+                timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            if executor is self._executor:
+                self._restart()
+            raise
+    
+    async def _dispatch(self):
+        while True:
+            pdf_content, future = await self._queue.get()
+            try:
+                try:
+                    result = await self._run(pdf_content)
+                except BrokenProcessPool:
+                    # Collateral damage from another job's timeout; try once more
+                    result = await self._run(pdf_content)
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.TimeoutError:
+                if not future.done():
+                    future.set_exception(TimeoutError(f"PDF parsing exceeded {self.timeout:g}s"))
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+    
+    async def extract(self, pdf_content):
+        """Queue PDF bytes or a temp file path for parsing and wait for the extract_pdf_document result"""
+        if self._executor is None:
+            self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((pdf_content, future))
+        return await future
+    
+    def close(self):
+        for task in self._dispatchers:
+            task.cancel()
+        self._dispatchers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class PdfCache:
+    """Content-addressed cache of PDF extraction results, persisted between runs.
+
+    Results are stored once per SHA-256 of the PDF body; a URL index maps each
+    normalized PDF URL to its last content hash and HTTP validators (ETag,
+    Last-Modified) so the next run can revalidate with a conditional request
+    instead of downloading. Stored results are evicted least-recently-used
+    once their total size passes ``max_bytes``. Backed by a named key-value
+    store, which is a local directory under ./storage when running offline.
+    """
+    
+    INDEX_KEY = 'INDEX'
+    
+    def __init__(self, store_name='mrpl-pdf-cache', max_bytes=50 * 1024 * 1024, enabled=True, text_budget=None):
+        self.store_name = store_name
+        # Results extracted under a different char/page budget are not reused
+        self.text_budget = list(text_budget) if text_budget else None
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._store = None
+        self._urls = {}  # url key -> {'hash', 'etag', 'last_modified'}
+        self._blobs = {}  # content hash -> {'size', 'last_used'}
+        self._lock = asyncio.Lock()
+        self._dirty = False
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'evicted': 0}
+    
+    async def _open(self):
+        if self._store is None:
+            self._store = await Actor.open_key_value_store(name=self.store_name)
+            index = await self._store.get_value(self.INDEX_KEY) or {}
+            self._urls = index.get('urls', {})
+            self._blobs = index.get('blobs', {})
+            Actor.log.info(f"🗄️ PDF cache loaded: {len(self._blobs)} documents, {len(self._urls)} URLs")
+    
+    async def conditional_headers(self, pdf_url):
+        """If-None-Match / If-Modified-Since headers for a URL seen in an earlier run"""
+        if not self.enabled:
+            return {}
+        async with self._lock:
+            await self._open()
+        entry = self._urls.get(normalize_url(pdf_url))
+        if not entry or entry['hash'] not in self._blobs:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    async def _load(self, content_hash):
+        result = await self._store.get_value(f"pdf-{content_hash}")
+        if result is None:
+            return None
+        # The budget only decides reuse; it is not part of the result handed to pages
+        result = dict(result)
+        if result.pop('text_budget', None) != self.text_budget:
+            return None
+        # A concurrent put() may have evicted the entry during the read
+        blob = self._blobs.get(content_hash)
+        if blob is not None:
+            blob['last_used'] = time.time()
+            self._dirty = True
+        return result
+    
+    async def get_unchanged(self, pdf_url):
+        """Stored result for a URL the server answered 304 Not Modified for"""
+        entry = self._urls.get(normalize_url(pdf_url))
+        if not entry or entry['hash'] not in self._blobs:
+            return None
+        result = await self._load(entry['hash'])
+        if result is not None:
+            self.stats['revalidated'] += 1
+        return result
+    
+    async def get_by_hash(self, pdf_url, content_hash, etag=None, last_modified=None):
+        """Stored result for identical PDF content, even if it came from another URL"""
+        if not self.enabled or content_hash not in self._blobs:
+            if self.enabled:
+                self.stats['misses'] += 1
+            return None
+        result = await self._load(content_hash)
+        if result is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        self._urls[normalize_url(pdf_url)] = {'hash': content_hash, 'etag': etag, 'last_modified': last_modified}
+        return result
+    
+    async def put(self, pdf_url, content_hash, result, etag=None, last_modified=None):
+        """Store an extraction result under its content hash"""
+        if not self.enabled:
+            return
+        result = dict(result, text_budget=self.text_budget)
+        # Serialized: concurrent PDF workers would otherwise evict the same entries
+        async with self._lock:
+            await self._store.set_value(f"pdf-{content_hash}", result)
+            self._blobs[content_hash] = {'size': len(json.dumps(result)), 'last_used': time.time()}
+            self._urls[normalize_url(pdf_url)] = {'hash': content_hash, 'etag': etag, 'last_modified': last_modified}
+            self._dirty = True
+            await self._evict()
+    
+    async def _evict(self):
+        """Drop least-recently-used results past max_bytes; called with the lock held"""
+        total = sum(blob['size'] for blob in self._blobs.values())
+        if total <= self.max_bytes:
+            return
+        for content_hash, blob in sorted(self._blobs.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            await self._store.delete_value(f"pdf-{content_hash}")
+            self._blobs.pop(content_hash, None)
+            total -= blob['size']
+            self.stats['evicted'] += 1
+        self._urls = {key: entry for key, entry in self._urls.items() if entry['hash'] in self._blobs}
+    
+    async def save(self):
+        """Persist the URL/blob index (results are written as they are added)"""
+        if self.enabled and self._store is not None and self._dirty:
+            await self._store.set_value(self.INDEX_KEY, {'urls': self._urls, 'blobs': self._blobs})
+            self._dirty = False
+
+
+class PdfScreenMemory:
+    """PDFs found not worth downloading, remembered between runs.
+
+    Pre-screen skips (not a PDF, too large, scanned) and PDFs whose full
+    parse produced no text are kept per normalized URL, with the reason and
+    size, in the named key-value store 'mrpl-pdf-screen'. Later runs skip
+    them without a request until the entry is ``ttl_days`` old; after that
+    the URL is screened again.
+    """
+    
+    STATE_KEY = 'SKIPPED'
+    
+    def __init__(self, store_name='mrpl-pdf-screen', enabled=True, ttl_days=30):
+        self.store_name = store_name
+        self.enabled = enabled
+        self.ttl = timedelta(days=ttl_days)
+        self._store = None
+        self._entries = {}
+        self._dirty = False
+        self.stats = {'screened': 0, 'skipped': 0, 'deferred': 0, 'remembered': 0}
+    
+    async def open(self):
+        if self.enabled and self._store is None:
+            self._store = await Actor.open_key_value_store(name=self.store_name)
+            self._entries = await self._store.get_value(self.STATE_KEY) or {}
+            Actor.log.info(f"🙈 PDF pre-screen: {len(self._entries)} PDFs remembered as not worth downloading")
+    
+    def get(self, pdf_url):
+        """The remembered skip for a URL, unless it has expired"""
+        entry = self._entries.get(normalize_url(pdf_url)) if self.enabled else None
+        if entry and datetime.now() - datetime.fromisoformat(entry['checked_at']) < self.ttl:
+            return entry
+        return None
+    
+    def remember(self, pdf_url, reason, size=None):
+        if self.enabled:
+            self._entries[normalize_url(pdf_url)] = {'reason': reason, 'size': size, 'checked_at': datetime.now().isoformat()}
+            self._dirty = True
+    
+    async def save(self):
+        if self.enabled and self._store is not None and self._dirty:
+            await self._store.set_value(self.STATE_KEY, self._entries)
+            self._dirty = False
+
+
+class PageStateStore:
+    """Per-URL change tracking between runs for incremental crawls.
+
+    Keeps each page's ETag, Last-Modified, a hash of the raw body and a
+    fingerprint of the extracted content in the named key-value store
+    'mrpl-page-state', so the next run can send conditional requests and
+    recognise pages whose content did not change.
+    """
+    
+    STATE_KEY = 'PAGES'
+    
+    def __init__(self, store_name='mrpl-page-state', enabled=False):
+        self.store_name = store_name
+        self.enabled = enabled
+        self._store = None
+        self._pages = {}
+        self._dirty = False
+        self.counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+    
+    async def open(self):
+        if self.enabled and self._store is None:
+            self._store = await Actor.open_key_value_store(name=self.store_name)
+            self._pages = await self._store.get_value(self.STATE_KEY) or {}
+            Actor.log.info(f"🔁 Incremental mode: {len(self._pages)} pages known from previous runs")
+    
+    def get(self, url):
+        return self._pages.get(normalize_url(url)) if self.enabled else None
+    
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers from the previous run"""
+        state = self.get(url)
+        headers = {}
+        if state:
+            if state.get('etag'):
+                headers['If-None-Match'] = state['etag']
+            if state.get('last_modified'):
+                headers['If-Modified-Since'] = state['last_modified']
+        return headers
+    
+    def update(self, url, **fields):
+        if self.enabled:
+            state = self._pages.setdefault(normalize_url(url), {})
+            state.update(fields, checked_at=datetime.now().isoformat())
+            self._dirty = True
+    
+    def count(self, change_status):
+        self.counts[change_status] += 1
+    
+    async def save(self):
+        if self.enabled and self._store is not None and self._dirty:
+            await self._store.set_value(self.STATE_KEY, self._pages)
+            self._dirty = False
+
+
+class StartupCache:
+    """Working base URL and home page from the last successful start.
+
+    Saved to the named key-value store 'mrpl-startup' so the next run can
+    revalidate the home page with one conditional request (and reuse the
+    stored HTML on a 304) instead of probing the site and downloading it
+    again. The HTML is kept as a separate binary record.
+    """
+    
+    STATE_KEY = 'STARTUP'
+    HTML_KEY = 'SEED_HTML'
+    
+    def __init__(self, store_name='mrpl-startup', enabled=True):
+        self.store_name = store_name
+        self.enabled = enabled
+        self._store = None
+    
+    async def load(self):
+        """Saved {'base_url', 'home_url', 'encoding', 'etag', 'last_modified', 'content'} or None"""
+        if not self.enabled:
+            return None
+        self._store = self._store or await Actor.open_key_value_store(name=self.store_name)
+        state = await self._store.get_value(self.STATE_KEY)
+        if not state:
+            return None
+        content = await self._store.get_value(self.HTML_KEY)
+        return dict(state, content=content) if content else None
+    
+    async def save(self, base_url, home_url, content, encoding=None, etag=None, last_modified=None):
+        if not self.enabled:
+            return
+        self._store = self._store or await Actor.open_key_value_store(name=self.store_name)
+        await self._store.set_value(self.HTML_KEY, content, content_type='application/octet-stream')
+        await self._store.set_value(self.STATE_KEY, {
+            'base_url': base_url,
+            'home_url': home_url,
+            'encoding': encoding,
+            'etag': etag,
+            'last_modified': last_modified,
+            'saved_at': datetime.now().isoformat()
+        })
+
+
+class CrawlState:
+    """Resumable crawl progress, checkpointed to the run's default key-value store.
+
+    Holds a snapshot of the frontier (queue, seen-set, pages handed out), the
+    outcome of every finished page and the PDF results extracted so far under
+    the 'CRAWL_STATE' key. A page counts as finished only once its dataset
+    record has been flushed; pages still in flight or buffered at checkpoint
+    time are put back in the queue. Pages flushed after the last checkpoint
+    are written to 'CRAWL_FLUSHED' with every dataset batch (tagged with the
+    checkpoint's sequence number), and load() takes them out of the restored
+    queue, so a resumed run neither loses nor re-pushes records.
+    """
+    
+    STATE_KEY = 'CRAWL_STATE'
+    FLUSHED_KEY = 'CRAWL_FLUSHED'
+    
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.pages = {}  # url -> 'scraped' | 'unchanged' | 'duplicate' | 'failed'
+        self.pdfs_processed = 0
+        self._pending = {}  # url -> (depth, status, pdf count) until the record is flushed
+        self._flushed_since = {}  # url -> [status, pdf count] flushed after the last checkpoint
+        self.sequence = 0
+        self._lock = asyncio.Lock()
+        self.restored = None
+        self.recovered = []  # URLs flushed after the restored checkpoint
+    
+    async def load(self):
+        """Previous checkpoint of this run, or None when starting fresh"""
+        if not self.enabled:
+            return None
+        state = await Actor.get_value(self.STATE_KEY)
+        if not state or state.get('finished'):
+            return None
+        self.pages = state.get('pages', {})
+        self.pdfs_processed = state.get('pdfs_processed', 0)
+        self.sequence = state.get('sequence', 0)
+        
+        # Records flushed after that checkpoint are already in the dataset: not queued again
+        flushed = await Actor.get_value(self.FLUSHED_KEY)
+        if flushed and flushed.get('sequence') == self.sequence:
+            for url, (status, pdf_count) in flushed['pages'].items():
+                self.pages[url] = status
+                self.pdfs_processed += pdf_count
+            self.recovered = list(flushed['pages'])
+            frontier = state['frontier']
+            frontier['queue'] = [entry for entry in frontier['queue'] if entry[1] not in flushed['pages']]
+            frontier['dispatched'] += len(self.recovered)
+        self.restored = state
+        Actor.log.info(f"♻️ Resuming crawl: {len(self.pages)} pages done, {len(state['frontier']['queue'])} queued")
+        return state
+    
+    def started(self, url, depth):
+        self._pending[url] = (depth, None, 0)
+    
+    def queued(self, url, status, pdf_count=0):
+        """The page's record went to the dataset writer; it is done once flushed"""
+        depth = self._pending.get(url, (0,))[0]
+        self._pending[url] = (depth, status, pdf_count)
+    
+    def finished(self, url, status):
+        """The page produced no dataset record"""
+        self._pending.pop(url, None)
+        self.pages[url] = status
+    
+    def flushed(self, records):
+        for record in records:
+            url = record.get('url')
+            if url in self._pending:
+                _, status, pdf_count = self._pending.pop(url)
+                self.pages[url] = status
+                self.pdfs_processed += pdf_count
+                self._flushed_since[url] = [status, pdf_count]
+    
+    async def save_flushed(self):
+        """Persist the pages flushed since the last checkpoint, right after their batch"""
+        if not self.enabled or not self._flushed_since:
+            return
+        async with self._lock:
+            await Actor.set_value(self.FLUSHED_KEY, {'sequence': self.sequence, 'pages': self._flushed_since})
+    
+    @property
+    def pages_scraped(self):
+        return sum(1 for status in self.pages.values() if status == 'scraped')
+    
+    def snapshot(self, frontier, pdf_results, finished=False):
+        frontier_state = frontier.snapshot()
+        # Unfinished pages go back to the front of the queue
+        top = max((priority for priority, _, _ in frontier_state['queue']), default=0) + 1
+        frontier_state['queue'] = [[top, url, depth] for url, (depth, _, _) in self._pending.items()] + frontier_state['queue']
+        frontier_state['dispatched'] = len(self.pages)
+        return {
+            'saved_at': datetime.now().isoformat(),
+            'sequence': self.sequence,
+            'finished': finished,
+            'frontier': frontier_state,
+            'pages': self.pages,
+            'pdfs_processed': self.pdfs_processed,
+            'pdf_results': pdf_results
+        }
+    
+    async def save(self, frontier, pdf_results, finished=False):
+        if not self.enabled or frontier is None:
+            return
+        async with self._lock:
+            # Snapshot synchronously so workers cannot change it halfway; the new sequence
+            # number retires the CRAWL_FLUSHED pages it now includes
+            self.sequence += 1
+            snapshot = self.snapshot(frontier, pdf_results, finished)
+            self._flushed_since = {}
+            await Actor.set_value(self.STATE_KEY, snapshot)
+
+
+def content_fingerprint(*parts):
+    """Stable hash over the extracted parts of a page"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8', 'replace'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class NearDuplicateIndex:
+    """In-memory SimHash index for pages whose main content is almost identical.
+
+    Each text is reduced to a 64-bit SimHash over its word 3-shingles; two
+    texts are near-duplicates when their fingerprints differ in at most
+    ``max_distance`` bits. Fingerprints are bucketed on ``max_distance + 1``
+    bit bands, so (pigeonhole) any match shares at least one band with the
+    query and only those buckets are compared. Texts shorter than
+    ``min_words`` are never matched: their fingerprints are mostly noise.
+    Pages that share a template but link different PDFs (notices, tender
+    pages) are not duplicates, so a match also needs the same PDF links.
+    """
+    
+    BITS = 64
+    
+    def __init__(self, max_distance=4, min_words=20):
+        self.max_distance = max(0, int(max_distance))
+        self.min_words = min_words
+        bands = self.max_distance + 1
+        width = self.BITS // bands
+        self._bands = [(i * width, self.BITS if i == bands - 1 else (i + 1) * width) for i in range(bands)]
+        self._buckets = {}  # (band, bits) -> [(fingerprint, url, pdf links)]
+        self.stats = {'checked': 0, 'indexed': 0, 'duplicates': 0, 'too_short': 0}
+    
+    @classmethod
+    def fingerprint(cls, words):
+        shingles = {' '.join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+        hashes = [format(int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+                  for shingle in shingles]
+        # Bit i is set when most shingle hashes have it set
+        threshold = len(hashes) / 2
+        bits = ''.join('1' if column.count('1') > threshold else '0' for column in zip(*hashes))
+        return int(bits, 2)
+    
+    def _keys(self, fingerprint):
+        bits = format(fingerprint, '064b')
+        return [(band, bits[start:end]) for band, (start, end) in enumerate(self._bands)]
+    
+    def check(self, url, text, pdf_links=()):
+        """(url of the earlier near-duplicate, bit distance) or None; unique pages are indexed"""
+        self.stats['checked'] += 1
+        words = text.lower().split()
+        if len(words) < self.min_words:
+            self.stats['too_short'] += 1
+            return None
+        
+        fingerprint = self.fingerprint(words)
+        keys = self._keys(fingerprint)
+        pdf_links = frozenset(pdf_links)
+        best = None
+        for key in keys:
+            for other, other_url, other_pdf_links in self._buckets.get(key, ()):
+                distance = bin(fingerprint ^ other).count('1')
+                if distance <= self.max_distance and other_pdf_links == pdf_links and (best is None or distance < best[1]):
+                    best = (other_url, distance)
+        if best is not None:
+            self.stats['duplicates'] += 1
+            return best
+        
+        for key in keys:
+            self._buckets.setdefault(key, []).append((fingerprint, url, pdf_links))
+        self.stats['indexed'] += 1
+        return None
+
+
+# <link rel="alternate" type="application/rss+xml|atom+xml" href="..."> in a page head
+FEED_LINK = re.compile(rb'<link\b[^>]*\btype=["\']application/(?:rss|atom)\+xml["\'][^>]*>', re.I)
+FEED_HREF = re.compile(rb'\bhref=["\']([^"\']+)["\']', re.I)
+
+
+def parse_lastmod(value):
+    """Sitemap lastmod (W3C datetime) or feed pubDate/updated as a naive local datetime, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    # Compared with the naive local timestamps kept in page state
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _feed_entry(element):
+    """(kind, url, lastmod text) for a finished <url>, <sitemap>, <item> or <entry> element"""
+    kind = _local_name(element.tag)
+    url = lastmod = None
+    for child in element:
+        name = _local_name(child.tag)
+        if name in ('loc', 'link') and url is None:
+            # Atom carries the URL in href; prefer rel="alternate" (the default) over others
+            url = child.text if child.text and child.text.strip() else None
+            if url is None and child.get('rel', 'alternate') == 'alternate':
+                url = child.get('href')
+        elif name in ('lastmod', 'pubDate', 'updated', 'published') and lastmod is None:
+            lastmod = child.text
+    if not url:
+        return None
+    return ('sitemap' if kind == 'sitemap' else 'page'), url.strip(), lastmod
+
+
+def iter_feed_entries(chunks, max_entries=FEED_MAX_ENTRIES):
+    """Stream (kind, url, lastmod) tuples out of a sitemap, sitemap index, RSS or Atom document.
+
+    ``chunks`` is any iterable of bytes, such as a streamed response body;
+    gzip input (sitemap.xml.gz) is inflated on the fly. Elements are
+    cleared as soon as they are read, so memory stays flat however large
+    the document is. ``kind`` is 'sitemap' for the children of a sitemap
+    index and 'page' otherwise; lastmod is parsed with parse_lastmod().
+    """
+    parser = ElementTree.XMLPullParser(events=('end',))
+    inflate = None
+    first = True
+    count = 0
+    
+    def entries():
+        for _, element in parser.read_events():
+            if _local_name(element.tag) in ('url', 'sitemap', 'item', 'entry'):
+                entry = _feed_entry(element)
+                element.clear()
+                if entry is not None:
+                    yield entry[0], entry[1], parse_lastmod(entry[2])
+    
+    for chunk in chunks:
+        if first:
+            first = False
+            if chunk[:2] == b'\x1f\x8b':
+                inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        parser.feed(inflate.decompress(chunk) if inflate is not None else chunk)
+        for entry in entries():
+            yield entry
+            count += 1
+            if count >= max_entries:
+                return
+    parser.close()
+    for entry in entries():
+        yield entry
+        count += 1
+        if count >= max_entries:
+            return
+
+
+class CrawlFrontier:
+    """Priority-ordered crawl frontier with O(1) de-duplication, shared by the page workers.
+
+    URLs are deduplicated on crawl_key() and popped highest priority first:
+    tender/notice/report sections score above navigation pages, children of
+    PDF-rich pages get a boost and every level of depth costs one point.
+    Links beyond ``max_depth`` are dropped and at most ``max_pages`` URLs are
+    ever handed out (either may be None for no limit). With a SiteProfile,
+    URLs its include/exclude patterns reject are dropped and each section
+    queues at most its section limit.
+    """
+    
+    PRIORITY_RULES = [
+        (re.compile(r'tender|e-?procurement|auction', re.I), 5.0),
+        (re.compile(r'notice|circular|announcement|press|news|media', re.I), 3.0),
+        (re.compile(r'investor|annual|report|financial|disclosure|policy|csr|sustainab', re.I), 2.0)
+    ]
+    
+    def __init__(self, max_pages, max_depth=3, max_queued=None, profile=None):
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.max_queued = max_queued
+        self.profile = profile
+        self._section_counts = {}
+        self._heap = []
+        self._seen = set()
+        self._seq = 0
+        self._in_flight = 0
+        self._changed = asyncio.Event()
+        self.dispatched = 0
+    
+    def __len__(self):
+        return len(self._heap)
+    
+    def priority(self, url, depth, boost=0.0):
+        path = urlsplit(url).path
+        score = boost - depth
+        for pattern, weight in self.PRIORITY_RULES:
+            if pattern.search(path):
+                score += weight
+                break
+        return score
+    
+    def add(self, url, depth=0, boost=0.0):
+        """Queue a URL unless it was seen before, is too deep or is not a page; returns True if queued"""
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        path = urlsplit(url).path
+        if PDF_EXTENSION.search(path) or ASSET_EXTENSION.search(path):
+            return False
+        if self.max_queued is not None and len(self._heap) >= self.max_queued:
+            return False
+        key = crawl_key(url)
+        if key in self._seen:
+            return False
+        if self.profile is not None:
+            if not self.profile.allows(url):
+                return False
+            section = self.profile.section(url)
+            if section is not None:
+                if self._section_counts.get(section, 0) >= self.profile.section_limits[section]:
+                    return False
+                self._section_counts[section] = self._section_counts.get(section, 0) + 1
+        self._seen.add(key)
+        self._seq += 1
+        heapq.heappush(self._heap, (-self.priority(url, depth, boost), self._seq, normalize_url(url), depth))
+        self._changed.set()
+        return True
+    
+    def skip(self, url):
+        """Mark a URL as seen without queueing it, so links to it are ignored too"""
+        self._seen.add(crawl_key(url))
+    
+    def _budget_spent(self):
+        return self.max_pages is not None and self.dispatched >= self.max_pages
+    
+    def pop(self):
+        """Highest-priority (url, depth) or None, without waiting"""
+        if not self._heap or self._budget_spent():
+            return None
+        _, _, url, depth = heapq.heappop(self._heap)
+        self.dispatched += 1
+        return url, depth
+    
+    async def next(self):
+        """Wait for the next (url, depth); None once the budget is spent or the crawl ran dry"""
+        while True:
+            item = self.pop()
+            if item is not None:
+                self._in_flight += 1
+                return item
+            if self._budget_spent() or self._in_flight == 0:
+                self._changed.set()  # Release the other idle workers too
+                return None
+            # Pages in flight may still add links
+            self._changed.clear()
+            await self._changed.wait()
+    
+    def done(self):
+        """Mark a page handed out by next() as finished"""
+        self._in_flight -= 1
+        self._changed.set()
+    
+    def snapshot(self):
+        """JSON-serialisable queue, seen-set and dispatch count"""
+        return {
+            'queue': [[-priority, url, depth] for priority, _, url, depth in sorted(self._heap)],
+            'seen': sorted(self._seen),
+            'dispatched': self.dispatched
+        }
+    
+    def restore(self, state):
+        """Reload a snapshot() taken by an interrupted run"""
+        self._seen.update(state['seen'])
+        for priority, url, depth in state['queue']:
+            self._seq += 1
+            heapq.heappush(self._heap, (-priority, self._seq, url, depth))
+        self.dispatched = state['dispatched']
+        self._changed.set()
+
+
+class PageParser:
+    """Extracts title, meta description, main content and link hrefs from HTML.
+
+    With lxml available the page is parsed once and walked once: every
+    element is checked against the content selectors (compiled to simple
+    tag/class/id predicates when the parser is built), so the
+    first-matching-selector rule needs no repeated tree searches. Without
+    lxml, or when a selector is more than a tag/class/id compound (descendant,
+    attribute or pseudo-class selectors), it falls back to the original
+    BeautifulSoup chain, which is also the reference the parse benchmark
+    checks against.
+    """
+    
+    SKIP_TEXT_TAGS = {'script', 'style', 'template'}
+    META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+    
+    def __init__(self, content_selectors=None):
+        self.content_selectors = list(content_selectors or CONTENT_SELECTORS)
+        self._matchers = [self._compile_selector(selector) for selector in self.content_selectors]
+        # select_one() handles any CSS selector; the single-pass walk only compound ones
+        self.single_pass = LXML_AVAILABLE and None not in self._matchers
+        self._parsers = {}
+    
+    @staticmethod
+    def _compile_selector(selector):
+        """(tag, id, classes) predicate for selectors like 'main', '.content', 'div#main.page', or None for other selectors"""
+        match = re.fullmatch(r'([a-zA-Z][\w-]*)?((?:[.#][\w-]+)*)', selector.strip())
+        if not match or not selector.strip():
+            return None
+        tag = match.group(1).lower() if match.group(1) else None
+        qualifiers = re.findall(r'([.#])([\w-]+)', match.group(2))
+        element_id = next((name for kind, name in qualifiers if kind == '#'), None)
+        classes = frozenset(name for kind, name in qualifiers if kind == '.')
+        return tag, element_id, classes
+    
+    @staticmethod
+    def _matches(element, tag, matcher):
+        want_tag, want_id, want_classes = matcher
+        if want_tag and tag != want_tag:
+            return False
+        if want_id and element.get('id') != want_id:
+            return False
+        if want_classes:
+            class_attr = element.get('class')
+            if not class_attr or not want_classes.issubset(class_attr.split()):
+                return False
+        return True
+    
+    def _text(self, element):
+        """Equivalent of BeautifulSoup's get_text(strip=True): stripped strings joined, script/style skipped"""
+        parts = []
+        
+        def walk(node):
+            if node.text:
+                text = node.text.strip()
+                if text:
+                    parts.append(text)
+            for child in node:
+                if isinstance(child.tag, str) and child.tag.lower() not in self.SKIP_TEXT_TAGS:
+                    walk(child)
+                if child.tail:
+                    text = child.tail.strip()
+                    if text:
+                        parts.append(text)
+        
+        walk(element)
+        return ''.join(parts)
+    
+    def _html_parser(self, encoding):
+        parser = self._parsers.get(encoding)
+        if parser is None:
+            try:
+                parser = lxml.html.HTMLParser(encoding=encoding)
+            except LookupError:
+                parser = self._html_parser('utf-8')
+            self._parsers[encoding] = parser
+        return parser
+    
+    def parse(self, content, encoding=None):
+        """Returns {'title', 'description', 'content', 'hrefs'} for raw HTML bytes.
+
+        ``encoding`` is the charset from the HTTP headers; without one the
+        <meta> charset is used, then UTF-8.
+        """
+        if not self.single_pass:
+            return self.parse_soup(content)
+        
+        if not encoding:
+            declared = self.META_CHARSET.search(content[:4096])
+            encoding = declared.group(1).decode('ascii') if declared else 'utf-8'
+        
+        try:
+            root = lxml.html.document_fromstring(content, parser=self._html_parser(encoding))
+        except lxml.etree.ParserError:
+            # Empty or whitespace-only document
+            return {'title': 'No title', 'description': '', 'content': '', 'hrefs': []}
+        
+        title_elem = None
+        description = ''
+        found_description = False
+        hrefs = []
+        best_rank = len(self._matchers)
+        content_elem = None
+        body = None
+        
+        for element in root.iter():
+            tag = element.tag
+            if not isinstance(tag, str):
+                continue  # Comments and processing instructions
+            tag = tag.lower()
+            
+            if tag == 'a':
+                href = element.get('href')
+                if href is not None:
+                    hrefs.append(href)
+            elif tag == 'title':
+                if title_elem is None:
+                    title_elem = element
+            elif tag == 'meta':
+                if not found_description and element.get('name') == 'description':
+                    description = element.get('content', '')
+                    found_description = True
+            elif tag == 'body' and body is None:
+                body = element
+            
+            # Earlier selectors win, and within a selector the first element in document order
+            for rank in range(best_rank):
+                if self._matches(element, tag, self._matchers[rank]):
+                    best_rank = rank
+                    content_elem = element
+                    break
+        
+        title = ''.join(title_elem.itertext()).strip() if title_elem is not None else 'No title'
+        content = self._text(content_elem) if content_elem is not None else ''
+        
+        # If no specific content found, get body text
+        if not content and body is not None:
+            content = self._text(body)
+        
+        return {'title': title, 'description': description, 'content': content, 'hrefs': hrefs}
+    
+    def parse_soup(self, content):
+        """Original BeautifulSoup extraction, kept as the no-lxml fallback and benchmark baseline"""
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Extract title
+        title_elem = soup.find('title')
+        title = title_elem.get_text().strip() if title_elem else 'No title'
+        
+        # Extract meta description
+        meta_desc = soup.find('meta', attrs={'name': 'description'})
+        description = meta_desc.get('content', '') if meta_desc else ''
+        
+        # Extract main content
+        content = ''
+        for selector in self.content_selectors:
+            content_elem = soup.select_one(selector)
+            if content_elem:
+                content = content_elem.get_text(strip=True)
+                break
+        
+        # If no specific content found, get body text
+        if not content:
+            body = soup.find('body')
+            if body:
+                content = body.get_text(strip=True)
+        
+        hrefs = [link['href'] for link in soup.find_all('a', href=True)]
+        return {'title': title, 'description': description, 'content': content, 'hrefs': hrefs}
+
+
+class RunMetrics:
+    """Per-stage timers and counters for one run.
+
+    ``timer()`` works from the event loop and from fetch threads alike. Each
+    stage keeps its raw samples (for percentiles) plus a fixed-bucket
+    histogram; ``summary()`` is the record written to the key-value store at
+    the end of the run.
+    """
+    
+    BUCKETS_MS = [10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+    
+    def __init__(self):
+        self.started = time.monotonic()
+        self.started_at = datetime.now().isoformat()
+        self._samples = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, stage, seconds, page_timings=None):
+        with self._lock:
+            self._samples.setdefault(stage, []).append(seconds)
+        if page_timings is not None:
+            page_timings[f"{stage}_ms"] = round(page_timings.get(f"{stage}_ms", 0) + seconds * 1000, 1)
+    
+    @contextmanager
+    def timer(self, stage, page_timings=None):
+        """Time a block into ``stage``; also accumulate it into a per-page timings dict if given"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, page_timings)
+    
+    def incr(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+    
+    def count(self, counter):
+        return self._counters.get(counter, 0)
+    
+    def samples(self, stage):
+        return list(self._samples.get(stage, []))
+    
+    @staticmethod
+    def _percentile(ordered, fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+    
+    def summary(self, **extra):
+        stages = {}
+        for stage, samples in self._samples.items():
+            ordered = sorted(samples)
+            histogram = {f"<={bucket}ms": 0 for bucket in self.BUCKETS_MS}
+            histogram[f">{self.BUCKETS_MS[-1]}ms"] = 0
+            for sample in ordered:
+                ms = sample * 1000
+                bucket = next((b for b in self.BUCKETS_MS if ms <= b), None)
+                histogram[f"<={bucket}ms" if bucket else f">{self.BUCKETS_MS[-1]}ms"] += 1
+            stages[stage] = {
+                'count': len(ordered),
+                'total_s': round(sum(ordered), 3),
+                'mean_ms': round(sum(ordered) / len(ordered) * 1000, 1),
+                'p50_ms': round(self._percentile(ordered, 0.5) * 1000, 1),
+                'p95_ms': round(self._percentile(ordered, 0.95) * 1000, 1),
+                'max_ms': round(ordered[-1] * 1000, 1),
+                'histogram': histogram
+            }
+        return {
+            'started_at': self.started_at,
+            'finished_at': datetime.now().isoformat(),
+            'duration_s': round(time.monotonic() - self.started, 3),
+            'stages': stages,
+            'counters': dict(sorted(self._counters.items())),
+            **extra
+        }
+
+
+@dataclass(slots=True)
+class PageRecord:
+    """What survives parsing a page: text, links and response metadata, but no HTML tree or body bytes"""
+    url: str
+    depth: int
+    title: str
+    description: str
+    web_content: str
+    status_code: int
+    page_size_bytes: int
+    validators: dict
+    internal_links: list = field(default_factory=list)
+    external_links: list = field(default_factory=list)
+    pdf_links: list = field(default_factory=list)
+    change_status: str = None
+    fingerprint: str = None
+
+
+class MemoryGovernor:
+    """Admission control for page workers based on resident memory.
+
+    Before a page starts, ``admit()`` compares the RSS of this process and
+    its children (the PDF workers) against ``high_water`` of ``budget_mb``
+    and waits while it is above, as long as another page is still in flight
+    to free memory. One page is always allowed through, so the crawl cannot
+    stall. RSS comes from psutil when installed, else /proc/self/statm, else
+    the peak from getrusage.
+    """
+    
+    def __init__(self, budget_mb=None, high_water=0.85, poll_interval=0.25, metrics=None):
+        self.budget_bytes = int(budget_mb * 1024 * 1024) if budget_mb else None
+        self.high_water = high_water
+        self.poll_interval = poll_interval
+        self.metrics = metrics or RunMetrics()
+        self._active = 0
+        self._process = psutil.Process() if PSUTIL_AVAILABLE else None
+        self.stats = {'throttled': 0, 'peak_rss_mb': 0.0}
+    
+    def rss(self):
+        """Current resident set size in bytes"""
+        if self._process is not None:
+            try:
+                total = self._process.memory_info().rss
+                for child in self._process.children(recursive=True):
+                    try:
+                        total += child.memory_info().rss
+                    except psutil.Error:
+                        pass
+                return total
+            except psutil.Error:
+                pass
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            pass
+        if resource is not None:
+            # Peak, not current; KiB on Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return 0
+    
+    def _over_budget(self):
+        rss = self.rss()
+        self.stats['peak_rss_mb'] = max(self.stats['peak_rss_mb'], round(rss / 1024 / 1024, 1))
+        return rss > self.budget_bytes * self.high_water
+    
+    async def admit(self):
+        """Wait until memory allows another page in flight"""
+        if self.budget_bytes:
+            throttled = False
+            while self._active > 0 and self._over_budget():
+                if not throttled:
+                    throttled = True
+                    self.stats['throttled'] += 1
+                    self.metrics.incr('memory_throttled')
+                await asyncio.sleep(self.poll_interval)
+        self._active += 1
+    
+    def release(self):
+        self._active -= 1
+
+
+class DatasetWriter:
+    """Buffered, batched replacement for per-record Actor.push_data.
+
+    Records go through a bounded queue (so a slow storage API slows the
+    crawl down instead of piling up memory) to a background task that pushes
+    them in batches once ``batch_size`` records or ``batch_bytes`` of JSON
+    have accumulated, or ``flush_interval`` seconds have passed. ``close()``
+    drains and flushes whatever is left; the crawl loop calls it from a
+    ``finally`` so nothing is lost on errors.
+    """
+    
+    def __init__(self, metrics=None, batch_size=25, batch_bytes=4 * 1024 * 1024, flush_interval=5.0, queue_size=100, on_flush=None):
+        self.metrics = metrics or RunMetrics()
+        self.on_flush = on_flush
+        self.batch_size = max(1, int(batch_size))
+        self.batch_bytes = batch_bytes
+        self.flush_interval = float(flush_interval)
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._task = None
+        self._closed = False
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self
+    
+    async def push(self, record):
+        """Queue one record; waits when the queue is full"""
+        if self._task is None:
+            self.start()
+        if self._task.done():
+            # The writer died; surface its error instead of blocking forever
+            self._task.result()
+            raise RuntimeError("Dataset writer is closed")
+        await self._queue.put(record)
+    
+    async def _flush(self, batch):
+        if not batch:
+            return
+        with self.metrics.timer('push_data'):
+            await Actor.push_data(batch)
+        self.metrics.incr('records_pushed', len(batch))
+        self.metrics.incr('push_batches')
+        if self.on_flush is not None:
+            result = self.on_flush(batch)
+            if asyncio.iscoroutine(result):
+                await result
+    
+    async def _run(self):
+        batch = []
+        batch_size_bytes = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                record = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                record = None
+            else:
+                if record is self:  # Close sentinel
+                    await self._flush(batch)
+                    return
+                batch.append(record)
+                record_bytes = len(json.dumps(record, default=str))
+                batch_size_bytes += record_bytes
+                self.metrics.incr('bytes_dataset', record_bytes)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            
+            if len(batch) >= self.batch_size or batch_size_bytes >= self.batch_bytes or (deadline and time.monotonic() >= deadline):
+                await self._flush(batch)
+                batch = []
+                batch_size_bytes = 0
+                deadline = None
+    
+    async def close(self):
+        """Flush everything still buffered and stop the writer"""
+        if self._closed or self._task is None:
+            self._closed = True
+            return
+        self._closed = True
+        if not self._task.done():
+            await self._queue.put(self)
+        await self._task
+
+
+class ResultExporter:
+    """Compressed export of the dataset records to the key-value store, metadata and text apart.
+
+    Every record becomes a metadata row (METADATA_COLUMNS: URL, title,
+    timestamps, status, counts and links) and, when it has any, a text row
+    (URL plus TEXT_COLUMNS), written to separate part files so jobs reading
+    titles, URLs and timestamps never download page text. Formats are
+    'jsonl-gzip', 'jsonl-zstd' (needs zstandard) and 'parquet' (needs
+    pyarrow), falling back to gzip JSON Lines when the library is missing.
+    JSON Lines rows are compressed as they arrive. A part is stored as
+    EXPORT-<meta|text>-<n>.<ext> once it holds ``part_records`` records, on
+    migration or abort and at the end of the run, and EXPORT-MANIFEST lists
+    the stored parts. Periodic checkpoints only snapshot the parts in
+    progress to EXPORT-OPEN-<meta|text> (noted under 'open' in the manifest),
+    which a resumed run reads back into its first part.
+    """
+    
+    FORMATS = {
+        'jsonl-gzip': ('jsonl.gz', 'application/gzip'),
+        'jsonl-zstd': ('jsonl.zst', 'application/zstd'),
+        'parquet': ('parquet', 'application/vnd.apache.parquet')
+    }
+    METADATA_COLUMNS = (
+        ('url', 'string'), ('title', 'string'), ('description', 'string'), ('scraped_at', 'string'),
+        ('status_code', 'int'), ('change_status', 'string'), ('duplicate_of', 'string'),
+        ('web_content_length', 'int'), ('total_text_length', 'int'), ('pdf_count', 'int'),
+        ('total_links', 'int'), ('page_size_bytes', 'int'),
+        ('pdf_links', 'list'), ('internal_links', 'list'), ('external_links', 'list')
+    )
+    TEXT_COLUMNS = (('web_content', 'string'), ('all_text_content', 'string'), ('pdf_documents', 'json'))
+    MANIFEST_KEY = 'EXPORT-MANIFEST'
+    OPEN_KEY = 'EXPORT-OPEN-{table}'
+    
+    def __init__(self, export_format='jsonl-gzip', part_records=1000, metrics=None):
+        if export_format not in self.FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+        if export_format == 'parquet' and not PARQUET_AVAILABLE:
+            Actor.log.warning("⚠️ pyarrow not installed, exporting gzip JSON Lines instead of Parquet")
+            export_format = 'jsonl-gzip'
+        if export_format == 'jsonl-zstd' and not ZSTD_AVAILABLE:
+            Actor.log.warning("⚠️ zstandard not installed, exporting gzip JSON Lines instead")
+            export_format = 'jsonl-gzip'
+        self.format = export_format
+        self.extension, self.content_type = self.FORMATS[export_format]
+        self.part_records = max(1, int(part_records))
+        self.metrics = metrics or RunMetrics()
+        self.manifest = {'format': export_format, 'records': 0, 'parts': []}
+        self._parts = {table: self._new_part() for table in ('meta', 'text')}
+        self._lock = asyncio.Lock()
+    
+    async def open(self, resumed=False):
+        """Continue the manifest (and the snapshotted parts in progress) of an interrupted run"""
+        if not resumed:
+            return
+        self.manifest = await Actor.get_value(self.MANIFEST_KEY) or self.manifest
+        snapshot = self.manifest.pop('open', None)
+        # Only a snapshot taken after the last stored part is current
+        if snapshot and snapshot['part'] == self._next_part():
+            for table in ('meta', 'text'):
+                if snapshot[table]:
+                    for row in self._read_snapshot(await Actor.get_value(self.OPEN_KEY.format(table=table))):
+                        self._add(table, row)
+    
+    def _next_part(self):
+        return len({part['part'] for part in self.manifest['parts']}) + 1
+    
+    def _new_part(self):
+        if self.format == 'parquet':
+            return {'rows': [], 'count': 0}
+        buffer = io.BytesIO()
+        if self.format == 'jsonl-zstd':
+            stream = zstandard.ZstdCompressor(level=10).stream_writer(buffer, closefd=False)
+        else:
+            stream = gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6)
+        return {'buffer': buffer, 'stream': stream, 'count': 0}
+    
+    def split(self, record):
+        """(metadata row, text row or None) for one dataset record"""
+        meta = {name: record.get(name) for name, _ in self.METADATA_COLUMNS}
+        meta['scraped_at'] = record.get('scraped_at') or record.get('checked_at')
+        if not any(record.get(name) for name, _ in self.TEXT_COLUMNS):
+            return meta, None
+        text = {'url': record.get('url')}
+        for name, kind in self.TEXT_COLUMNS:
+            value = record.get(name)
+            # Parquet keeps nested PDF entries as a JSON string column
+            text[name] = json.dumps(value, ensure_ascii=False) if kind == 'json' and self.format == 'parquet' else value
+        return meta, text
+    
+    def _add(self, table, row):
+        part = self._parts[table]
+        if self.format == 'parquet':
+            part['rows'].append(row)
+        else:
+            part['stream'].write(json.dumps(row, ensure_ascii=False).encode('utf-8') + b'\n')
+        part['count'] += 1
+    
+    async def write(self, records):
+        """Add a batch of dataset records; full parts are stored right away"""
+        async with self._lock:
+            for record in records:
+                meta, text = self.split(record)
+                self._add('meta', meta)
+                if text is not None:
+                    self._add('text', text)
+                self.manifest['records'] += 1
+            if self._parts['meta']['count'] >= self.part_records:
+                await self._store_parts()
+    
+    async def flush(self):
+        """Store the parts in progress, even if not full (on migration or abort and at the end)"""
+        async with self._lock:
+            await self._store_parts()
+    
+    async def snapshot(self):
+        """Save the parts in progress without closing them, so a crashed run can resume them"""
+        async with self._lock:
+            counts = {table: part['count'] for table, part in self._parts.items()}
+            if not counts['meta'] or self.manifest.get('open') == dict(counts, part=self._next_part()):
+                return
+            for table, part in self._parts.items():
+                if part['count']:
+                    await Actor.set_value(self.OPEN_KEY.format(table=table), self._snapshot(part), content_type='application/octet-stream')
+            self.manifest['open'] = dict(counts, part=self._next_part())
+            await Actor.set_value(self.MANIFEST_KEY, self.manifest)
+    
+    def _snapshot(self, part):
+        """The rows of an open part so far: the compressed stream flushed to a block boundary"""
+        if self.format == 'parquet':
+            return gzip.compress(json.dumps(part['rows'], ensure_ascii=False).encode('utf-8'))
+        part['stream'].flush()
+        return part['buffer'].getvalue()
+    
+    def _read_snapshot(self, data):
+        if not data:
+            return []
+        if self.format == 'parquet':
+            return json.loads(gzip.decompress(data))
+        # The snapshot is a stream cut at a flush point, without the end of frame
+        if self.format == 'jsonl-zstd':
+            text = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        else:
+            text = zlib.decompressobj(wbits=31).decompress(data)
+        return [json.loads(line) for line in text.splitlines() if line]
+    
+    def _finish(self, table, part):
+        if self.format != 'parquet':
+            part['stream'].close()
+            return part['buffer'].getvalue()
+        sink = io.BytesIO()
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(part['rows'], schema=self._schema(table)), sink, compression='zstd')
+        return sink.getvalue()
+    
+    def _schema(self, table):
+        types = {'string': pyarrow.string(), 'json': pyarrow.string(), 'int': pyarrow.int64(), 'list': pyarrow.list_(pyarrow.string())}
+        columns = self.METADATA_COLUMNS if table == 'meta' else (('url', 'string'),) + self.TEXT_COLUMNS
+        return pyarrow.schema([(name, types[kind]) for name, kind in columns])
+    
+    async def _store_parts(self):
+        if not self._parts['meta']['count']:
+            return
+        number = self._next_part()
+        for table, part in self._parts.items():
+            if not part['count']:
+                continue
+            data = self._finish(table, part)
+            key = f"EXPORT-{table}-{number:05d}.{self.extension}"
+            with self.metrics.timer('export_store'):
+                await Actor.set_value(key, data, content_type=self.content_type)
+            self.metrics.incr(f'bytes_export_{table}', len(data))
+            self.manifest['parts'].append({'part': number, 'table': table, 'key': key, 'records': part['count'], 'bytes': len(data)})
+        self.manifest.pop('open', None)
+        await Actor.set_value(self.MANIFEST_KEY, self.manifest)
+        self._parts = {table: self._new_part() for table in ('meta', 'text')}
+    
+    def sizes(self):
+        """Stored bytes per table"""
+        sizes = {'meta': 0, 'text': 0}
+        for part in self.manifest['parts']:
+            sizes[part['table']] += part['bytes']
+        return sizes
+
+
+class SearchIndex:
+    """Full-text index (SQLite FTS5) over page and PDF text, kept up to date across runs.
+
+    Each page and each PDF is one row of ``documents`` (URL, kind, title, the
+    linking page for PDFs, a content hash), mirrored by the FTS5 table
+    ``documents_fts`` (title and body, porter-stemmed) under the same rowid.
+    New and changed pages are (re)indexed as they complete, unchanged ones
+    are left as the previous run indexed them and near-duplicates are
+    removed. The database lives in memory and is stored gzip-compressed
+    (sqlite3 serialize/deserialize) as INDEX in the named
+    key-value store 'mrpl-search-index'. search() ranks hits with BM25,
+    weighting title matches above body matches.
+    """
+    
+    STATE_KEY = 'INDEX'
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL, kind TEXT NOT NULL, "
+        "title TEXT, page_url TEXT, content_hash TEXT, indexed_at TEXT)",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(title, body, tokenize='porter unicode61')"
+    )
+    
+    def __init__(self, store_name='mrpl-search-index', enabled=True):
+        self.store_name = store_name
+        self.enabled = enabled
+        self._store = None
+        self._conn = None
+        self._dirty = False
+        self.documents = 0
+        self.stats = {'indexed': 0, 'unchanged': 0, 'removed': 0}
+    
+    @classmethod
+    def from_bytes(cls, data):
+        """Read-only copy of a stored INDEX value (gzip-compressed or plain SQLite bytes)"""
+        return cls(enabled=False).connect(data)
+    
+    def connect(self, data=None):
+        if self._conn is None:
+            self._conn = sqlite3.connect(':memory:')
+            if data:
+                self._conn.deserialize(gzip.decompress(data) if data[:2] == b'\x1f\x8b' else data)
+            for statement in self.SCHEMA:
+                self._conn.execute(statement)
+        return self
+    
+    async def open(self):
+        """Load the index saved by earlier runs"""
+        if self.enabled and self._store is None:
+            self._store = await Actor.open_key_value_store(name=self.store_name)
+            self.connect(await self._store.get_value(self.STATE_KEY))
+            Actor.log.info(f"🔎 Search index: {len(self)} documents from previous runs")
+    
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM documents').fetchone()[0] if self._conn else 0
+    
+    def add(self, url, kind, title, body, page_url=None):
+        """Index or re-index one document; returns False when its text did not change"""
+        key = normalize_url(url)
+        content_hash = content_fingerprint(title, body)
+        row = self._conn.execute('SELECT id, content_hash FROM documents WHERE url = ?', (key,)).fetchone()
+        if row and row[1] == content_hash:
+            self.stats['unchanged'] += 1
+            return False
+        
+        indexed_at = datetime.now().isoformat()
+        if row:
+            doc_id = row[0]
+            self._conn.execute('DELETE FROM documents_fts WHERE rowid = ?', (doc_id,))
+            self._conn.execute(
+                'UPDATE documents SET kind = ?, title = ?, page_url = ?, content_hash = ?, indexed_at = ? WHERE id = ?',
+                (kind, title, page_url, content_hash, indexed_at, doc_id)
+            )
+        else:
+            doc_id = self._conn.execute(
+                'INSERT INTO documents (url, kind, title, page_url, content_hash, indexed_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, kind, title, page_url, content_hash, indexed_at)
+            ).lastrowid
+        self._conn.execute('INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)', (doc_id, title, body))
+        self.stats['indexed'] += 1
+        self._dirty = True
+        return True
+    
+    def add_page(self, page, pdf_documents):
+        """Index a finished page (PageRecord) and the PDFs it links to that yielded text"""
+        self.add(page.url, 'page', page.title, f"{page.description}\n{page.web_content}")
+        for doc in pdf_documents:
+            if doc.get('pdf_text'):
+                # Titled by file name so a PDF linked from several pages is indexed once
+                self.add(doc['pdf_url'], 'pdf', doc['pdf_url'].rsplit('/', 1)[-1], doc['pdf_text'], page.url)
+    
+    def remove(self, url):
+        row = self._conn.execute('SELECT id FROM documents WHERE url = ?', (normalize_url(url),)).fetchone()
+        if row:
+            self._conn.execute('DELETE FROM documents_fts WHERE rowid = ?', (row[0],))
+            self._conn.execute('DELETE FROM documents WHERE id = ?', (row[0],))
+            self.stats['removed'] += 1
+            self._dirty = True
+    
+    def search(self, query, limit=10, kind=None):
+        """Ranked hits for the words in ``query`` (all must match): url, kind, title, page_url, score, snippet"""
+        terms = ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+        if not terms:
+            return []
+        sql = (
+            "SELECT d.url, d.kind, d.title, d.page_url, bm25(documents_fts, 5.0, 1.0) AS rank, "
+            "snippet(documents_fts, 1, '[', ']', '…', 16) FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+            "WHERE documents_fts MATCH ?" + (" AND d.kind = ?" if kind else "") + " ORDER BY rank LIMIT ?"
+        )
+        params = (terms, kind, limit) if kind else (terms, limit)
+        return [
+            {'url': url, 'kind': doc_kind, 'title': title, 'page_url': page_url, 'score': round(-rank, 3), 'snippet': snippet}
+            for url, doc_kind, title, page_url, rank, snippet in self._conn.execute(sql, params)
+        ]
+    
+    async def save(self):
+        if self.enabled and self._store is not None and self._dirty:
+            self._dirty = False
+            self._conn.commit()
+            # Snapshot on the loop's thread (the connection is not shared), compress off it
+            data = await asyncio.to_thread(gzip.compress, self._conn.serialize(), 6)
+            await self._store.set_value(self.STATE_KEY, data, content_type='application/gzip')
+    
+    def close(self):
+        if self._conn is not None:
+            self.documents = len(self)
+            self._conn.close()
+            self._conn = None
+
+
+class PdfWorkQueue:
+    """Crawl-wide, de-duplicated PDF work queue drained by a fixed set of tasks.
+
+    Pages submit PDF URLs and get a future per document back; a document is
+    processed once per run however many pages link to it. ``process`` (an
+    async callable taking the URL) runs for at most ``concurrency`` PDFs at a
+    time across the whole crawl. Downloads are charged against
+    ``byte_budget``; once it is spent, queued PDFs resolve to a 'skipped'
+    result without a request. PDFs already downloading when the budget runs
+    out still finish, so a run can overshoot by up to ``concurrency``
+    documents. A job that raises _PdfDeferred goes to the back of the queue
+    and is run once more, with ``deferred=True``, after everything queued
+    before it.
+    """
+    
+    def __init__(self, process, concurrency=4, byte_budget=None, metrics=None):
+        self._process = process
+        self.concurrency = max(1, int(concurrency))
+        self.byte_budget = byte_budget
+        self.bytes_used = 0
+        self.metrics = metrics or RunMetrics()
+        self._queue = asyncio.Queue()
+        self._futures = {}  # normalize_url(pdf_url) -> Future of the result
+        self._deferred = []
+        self._workers = []
+        self.stats = {'queued': 0, 'deduplicated': 0, 'over_budget': 0, 'deferred': 0}
+    
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        return self
+    
+    def submit(self, pdf_url):
+        """Future of the PDF's result (a dict or None), shared by every page linking to it"""
+        key = normalize_url(pdf_url)
+        future = self._futures.get(key)
+        if future is not None:
+            self.stats['deduplicated'] += 1
+            self.metrics.incr('pdf_dedup_in_run')
+            return future
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._futures[key] = future
+        self._queue.put_nowait((pdf_url, future))
+        self.stats['queued'] += 1
+        return future
+    
+    def seed(self, pdf_url, result):
+        """Register a result carried over from an interrupted run"""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(result)
+        self._futures[normalize_url(pdf_url)] = future
+    
+    def charge(self, size):
+        """Count downloaded PDF bytes against the budget"""
+        self.bytes_used += size
+    
+    @property
+    def exhausted(self):
+        return self.byte_budget is not None and self.bytes_used >= self.byte_budget
+    
+    def fits(self, size):
+        """Whether downloading ``size`` more bytes stays within the budget"""
+        return self.byte_budget is None or self.bytes_used + size <= self.byte_budget
+    
+    @staticmethod
+    def skipped(pdf_url, error):
+        """Result for a PDF that was deliberately not downloaded"""
+        return {
+            'pdf_url': pdf_url,
+            'pdf_text': '',
+            'pdf_text_length': 0,
+            'extraction_method': 'skipped',
+            'error': error
+        }
+    
+    def results(self):
+        """normalize_url(pdf_url) -> result for every PDF finished so far"""
+        return {
+            key: future.result() for key, future in self._futures.items()
+            if future.done() and not future.cancelled() and future.exception() is None
+        }
+    
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            deferred = item is None  # Wake-up token queued behind a deferred job
+            if deferred:
+                if not self._deferred:
+                    continue
+                item = self._deferred.pop(0)
+            pdf_url, future = item
+            if future.done():
+                continue
+            if self.exhausted:
+                if self.stats['over_budget'] == 0:
+                    Actor.log.warning(f"💸 PDF byte budget of {self.byte_budget / 1024 / 1024:g}MB spent, skipping the remaining PDFs")
+                self.stats['over_budget'] += 1
+                self.metrics.incr('pdfs_over_budget')
+                future.set_result(self.skipped(pdf_url, 'PDF byte budget exhausted'))
+                continue
+            try:
+                result = await self._process(pdf_url, deferred)
+            except _PdfDeferred:
+                self.stats['deferred'] += 1
+                self._deferred.append(item)
+                self._queue.put_nowait(None)
+                continue
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+    
+    async def close(self):
+        """Stop the workers and cancel PDFs nobody will wait for any more"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for future in self._futures.values():
+            future.cancel()
+        for _, future in self._deferred:
+            future.cancel()
+
+
 class MRPLScraperV4_WithPDF:
-    def __init__(self, max_pages=10, delay=2.0, extract_pdfs=True):
+    def __init__(self, max_pages=10, delay=2.0, extract_pdfs=True, max_concurrency=3,
+                 requests_per_second=None, burst=1, adaptive_rate_limit=True,
+                 pdf_workers=2, pdf_timeout=60, pdf_cache=True, pdf_cache_max_mb=50,
+                 incremental=False, emit_unchanged=True, max_depth=3, base_url=None,
+                 metrics_per_page=False, push_batch_size=25, push_flush_seconds=5.0,
+                 output_mode='inline', pdf_max_chars=PDF_MAX_CHARS, pdf_max_pages=PDF_MAX_PAGES,
+                 resume_state=True, max_retries=3, warm_start=True, skip_near_duplicates=False,
+                 near_duplicate_distance=4, memory_budget_mb=None, site_profile=None, use_sitemaps=True,
+                 pdf_concurrency=4, pdf_budget_mb=200, pdf_prescreen=True, export_format=None, search_index=False):
         self.max_pages = max_pages
         self.delay = delay
         self.extract_pdfs = extract_pdfs
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.pdf_concurrency = max(1, int(pdf_concurrency))
+        
+        # Domains, seeds, selectors and URL rules; base_url alone is enough to crawl a mirror or the benchmark server
+        self.profile = site_profile if isinstance(site_profile, SiteProfile) else SiteProfile.from_input(site_profile, base_url)
+        self.base_url = self.profile.base_url
+        self.base_host = urlsplit(self.base_url).netloc.lower()
+        
+        # Per-host pacing; without an explicit rate fall back to one request per `delay`
+        if not requests_per_second:
+            requests_per_second = 1.0 / delay if delay else 1.0
+        self.rate_limiter = HostRateLimiter(requests_per_second, burst, adaptive_rate_limit)
+        
+        # Blocking HTTP calls (page workers and PDF downloads) run on a bounded thread pool so the event loop stays free
+        fetch_slots = self.max_concurrency + self.pdf_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=fetch_slots, thread_name_prefix='mrpl-fetch')
+        
+        # PDF parsing is CPU-bound and goes to its own process pool
+        self.pdf_max_chars = pdf_max_chars
+        self.pdf_pool = PdfExtractionPool(workers=pdf_workers, timeout=pdf_timeout, max_chars=pdf_max_chars, max_pages=pdf_max_pages)
+        
+        # Extraction results are reused within the run and, via the cache, across runs
+        self.pdf_cache = PdfCache(
+            max_bytes=int(pdf_cache_max_mb * 1024 * 1024), enabled=pdf_cache, text_budget=(pdf_max_chars, pdf_max_pages)
+        )
+        
+        # Incremental mode: skip pages that did not change since the previous run
+        self.page_state = PageStateStore(enabled=incremental)
+        self.emit_unchanged = emit_unchanged
+        
+        # HTML extraction with the content selector chain compiled once
+        self.page_parser = PageParser(self.profile.content_selectors)
+        self.links = LinkExtractor(self.profile)
+        
+        # Pages whose main content nearly matches an earlier page are recorded but not processed
+        self.near_duplicates = NearDuplicateIndex(near_duplicate_distance) if skip_near_duplicates else None
+        
+        # Discovery reads robots.txt sitemaps and feeds before falling back to the home page's anchors
+        self.use_sitemaps = use_sitemaps
+        self._lastmod_unchanged = []  # Sitemap URLs skipped on lastmod, recorded once the writer runs
+        
+        # Created by run(); scrape_page feeds discovered links into it
+        self.max_depth = max_depth
+        self.frontier = None
+        
+        # Stage timings and counters; summarised into RUN_METRICS at the end of run()
+        self.metrics = RunMetrics()
+        self.metrics_per_page = metrics_per_page
+        
+        # PDFs linked from any page go through one de-duplicated queue with a global
+        # in-flight limit and byte budget; page records complete when their PDFs do
+        self.pdf_queue = PdfWorkQueue(
+            self._extract_pdf_text, concurrency=self.pdf_concurrency,
+            byte_budget=int(pdf_budget_mb * 1024 * 1024) if pdf_budget_mb else None, metrics=self.metrics
+        )
+        self._completions = set()
+        
+        # Range probes decide download / skip / defer before a PDF is fetched in full; skips are remembered
+        self.pdf_prescreen = pdf_prescreen
+        self.pdf_screen = PdfScreenMemory(enabled=pdf_prescreen)
+        
+        # Hold back new pages while RSS is near the Actor's memory allocation
+        if memory_budget_mb is None and os.environ.get('ACTOR_MEMORY_MBYTES', '').isdigit():
+            memory_budget_mb = int(os.environ['ACTOR_MEMORY_MBYTES'])
+        self.memory = MemoryGovernor(memory_budget_mb, metrics=self.metrics)
+        
+        # Dataset records are pushed in batches by a background writer
+        self.push_batch_size = push_batch_size
+        self.push_flush_seconds = push_flush_seconds
+        self.writer = None
+        
+        # 'normalized' stores each unique PDF once (PDF-<sha256> records) and pages reference it
+        self.output_mode = output_mode
+        self._pdf_documents_stored = set()
+        
+        # Optional compressed export of the same records (EXPORT-* keys), metadata and text in separate parts
+        self.exporter = ResultExporter(export_format, metrics=self.metrics) if export_format and export_format != 'none' else None
+        
+        # Optional full-text index of page and PDF text, carried across runs ('mrpl-search-index' store)
+        self.search_index = SearchIndex() if search_index else None
+        
+        # Checkpointed progress so a migrated or restarted run picks up where it stopped
+        self.crawl_state = CrawlState(enabled=resume_state)
+        self._checkpoint_lock = asyncio.Lock()
+        
+        # Base URL and home page kept for warm starts; pages already downloaded at startup
+        self.startup_cache = StartupCache(enabled=warm_start)
+        self._prefetched = {}
         
         # Create session with aggressive SSL bypass
         self.session = requests.Session()
@@ -51,8 +2470,10 @@ class MRPLScraperV4_WithPDF:
                 kwargs['ssl_context'] = ctx
                 return super().init_poolmanager(*args, **kwargs)
         
-        self.session.mount('https://', SSLAdapter())
-        self.session.mount('http://', HTTPAdapter())
+        # Size the connection pools to the number of in-flight requests
+        pool_size = max(10, fetch_slots)
+        self.session.mount('https://', SSLAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+        self.session.mount('http://', HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
         
         # Set headers
         self.session.headers.update({
@@ -67,90 +2488,286 @@ class MRPLScraperV4_WithPDF:
             'Sec-Fetch-Site': 'none',
             'Cache-Control': 'max-age=0'
         })
+        
+        # Pacing, retries with backoff and the per-host HTTPS/HTTP decision
+        self.fetcher = FetchClient(
+            self.session, self.rate_limiter, self.metrics,
+            executor=self._executor, max_in_flight=fetch_slots, max_retries=max_retries
+        )
     
-    async def extract_pdf_text(self, pdf_url):
-        """Extract text from PDF file with multiple methods"""
-        try:
-            Actor.log.info(f"📄 Downloading PDF: {pdf_url}")
-            
-            # Download PDF with timeout
-            response = self.session.get(pdf_url, timeout=60, stream=True)
+    async def fetch(self, url, **kwargs):
+        """Non-blocking, rate-limited, retried GET through the shared session"""
+        return await self.fetcher.get(url, **kwargs)
+    
+    def _download_pdf(self, pdf_url, headers=None):
+        """Timed wrapper around _stream_pdf"""
+        with self.metrics.timer('pdf_download'):
+            return self._stream_pdf(pdf_url, headers)
+    
+    def _stream_pdf(self, pdf_url, headers=None):
+        """Blocking, streamed PDF download capped at PDF_MAX_BYTES.
+
+        Small documents are kept as bytes; once PDF_SPOOL_BYTES is crossed the
+        body is spilled to a named temp file (worker processes need a path to
+        open it). Returns a dict with the source (bytes or path), size, SHA-256
+        and validators, {'not_modified': True} on a 304, or None when the
+        document is over the cap.
+        """
+        with self.session.get(pdf_url, timeout=60, stream=True, headers=headers) as response:
+            if response.status_code == 304:
+                return {'not_modified': True}
             response.raise_for_status()
             
-            # Check file size (limit to 50MB)
+            # Check declared file size before reading anything
             content_length = response.headers.get('content-length')
-            if content_length and int(content_length) > 50 * 1024 * 1024:
+            if content_length and content_length.isdigit() and int(content_length) > PDF_MAX_BYTES:
                 Actor.log.warning(f"⚠️ PDF too large ({content_length} bytes), skipping: {pdf_url}")
                 return None
             
-            # Read PDF content
-            pdf_content = response.content
-            Actor.log.info(f"✅ Downloaded PDF: {len(pdf_content)} bytes")
+            buffer = io.BytesIO()
+            spill = None
+            size = 0
+            digest = hashlib.sha256()
+            try:
+                for chunk in response.iter_content(chunk_size=PDF_CHUNK_BYTES):
+                    size += len(chunk)
+                    digest.update(chunk)
+                    
+                    # Enforce the cap mid-stream so chunked responses cannot bypass it
+                    if size > PDF_MAX_BYTES:
+                        Actor.log.warning(f"⚠️ PDF exceeded {PDF_MAX_BYTES} bytes mid-download, aborting: {pdf_url}")
+                        raise _PdfTooLarge()
+                    
+                    if spill is None and size > PDF_SPOOL_BYTES:
+                        spill = tempfile.NamedTemporaryFile(prefix='mrpl-pdf-', suffix='.pdf', delete=False)
+                        spill.write(buffer.getbuffer())
+                        buffer = None
+                    
+                    (spill or buffer).write(chunk)
+            except BaseException as e:
+                if spill is not None:
+                    spill.close()
+                    os.unlink(spill.name)
+                if isinstance(e, _PdfTooLarge):
+                    return None
+                raise
             
-            # Try multiple PDF extraction methods
-            extracted_text = None
+            self.metrics.incr('bytes_pdf', size)
+            download = {
+                'not_modified': False,
+                'size': size,
+                'sha256': digest.hexdigest(),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+        
+        if spill is not None:
+            spill.close()
+            download['source'] = spill.name
+        else:
+            download['source'] = buffer.getvalue()
+        return download
+    
+    def _probe_pdf(self, pdf_url):
+        """Blocking pre-screen read of the first PDF_PROBE_BYTES.
+
+        Uses a Range request; a server that ignores it is cut off after the
+        first PDF_PROBE_BYTES of the full response. ``complete`` is set when
+        the head already holds the whole document.
+        """
+        headers = {'Range': f'bytes=0-{PDF_PROBE_BYTES - 1}', 'Accept-Encoding': 'identity'}
+        with self.session.get(pdf_url, timeout=30, stream=True, headers=headers) as response:
+            response.raise_for_status()
+            ranged = response.status_code == 206
+            if ranged:
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                size = int(total) if total.isdigit() else None
+            else:
+                content_length = response.headers.get('content-length', '')
+                size = int(content_length) if content_length.isdigit() else None
             
-            # Method 1: Try pdfplumber (best for complex PDFs)
-            if PDFPLUMBER_AVAILABLE and not extracted_text:
+            head = b''
+            for chunk in response.iter_content(chunk_size=PDF_CHUNK_BYTES):
+                head += chunk
+                if len(head) >= PDF_PROBE_BYTES:
+                    break
+            else:
+                size = size if size is not None else len(head)  # The body ended inside the window
+            head = head[:PDF_PROBE_BYTES]
+            probe = {
+                'size': size,
+                'ranged': ranged,
+                'content_type': response.headers.get('content-type', ''),
+                'head': head,
+                'tail': b'',
+                'complete': size is not None and len(head) >= size,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+        self.metrics.incr('bytes_pdf_probe', len(head))
+        return probe
+    
+    def _probe_pdf_tail(self, pdf_url):
+        """Blocking read of the last PDF_TAIL_BYTES (trailer, xref and late objects), or b'' without Range support"""
+        headers = {'Range': f'bytes=-{PDF_TAIL_BYTES}', 'Accept-Encoding': 'identity'}
+        with self.session.get(pdf_url, timeout=30, headers=headers) as response:
+            tail = response.content[-PDF_TAIL_BYTES:] if response.status_code == 206 else b''
+        self.metrics.incr('bytes_pdf_probe', len(tail))
+        return tail
+    
+    def close(self):
+        """Release the fetch thread pool, PDF workers and pooled connections"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.pdf_pool.close()
+        self.session.close()
+        if self.search_index is not None:
+            self.search_index.close()
+    
+    async def extract_pdf_text(self, pdf_url):
+        """Extract text from a PDF once per run, however many pages link to it"""
+        # Shielded: other pages may be waiting on the same document
+        result = await asyncio.shield(self.pdf_queue.submit(pdf_url))
+        return dict(result, pdf_url=pdf_url) if result else result
+    
+    async def _screen_pdf(self, pdf_url, deferred=False):
+        """Pre-screen stage: (skipped result, None), (None, download) when the probe got the whole file, or (None, None) to download.
+
+        Raises _PdfDeferred for a large PDF of unconfirmed value the first time it comes up.
+        """
+        remembered = self.pdf_screen.get(pdf_url)
+        if remembered:
+            self.pdf_screen.stats['remembered'] += 1
+            Actor.log.info(f"🙈 Skipping PDF remembered as {remembered['reason']}: {pdf_url}")
+            return PdfWorkQueue.skipped(pdf_url, f"Pre-screen: {remembered['reason']}"), None
+        
+        with self.metrics.timer('pdf_screen'):
+            probe = await self.fetcher.request(pdf_url, self._probe_pdf, track_latency=False)
+            if probe['ranged'] and probe['size'] and probe['size'] > PDF_PROBE_BYTES:
+                # A separate request, paced with its own rate-limiter token; the tail is optional
                 try:
-                    Actor.log.info("🔧 Trying pdfplumber extraction...")
-                    with io.BytesIO(pdf_content) as pdf_file:
-                        with pdfplumber.open(pdf_file) as pdf:
-                            text_parts = []
-                            for page_num, page in enumerate(pdf.pages[:20]):  # Limit to 20 pages
-                                page_text = page.extract_text()
-                                if page_text:
-                                    text_parts.append(page_text)
-                            
-                            if text_parts:
-                                extracted_text = '\n'.join(text_parts)
-                                Actor.log.info(f"✅ pdfplumber extracted {len(extracted_text)} characters")
+                    probe['tail'] = await self.fetcher.request(pdf_url, self._probe_pdf_tail, track_latency=False)
                 except Exception as e:
-                    Actor.log.warning(f"⚠️ pdfplumber failed: {str(e)}")
+                    Actor.log.warning(f"⚠️ PDF tail probe failed for {pdf_url}: {str(e)}")
+        self.pdf_queue.charge(len(probe['head']) + len(probe['tail']))
+        self.pdf_screen.stats['screened'] += 1
+        
+        verdict, reason = screen_pdf(probe['head'], probe['tail'], probe['size'], probe['content_type'], probe['complete'])
+        if probe['complete']:
+            # The probe already holds the whole document: the parser decides, nothing is skipped or remembered
+            return None, {
+                'not_modified': False,
+                'size': len(probe['head']),
+                'sha256': hashlib.sha256(probe['head']).hexdigest(),
+                'etag': probe['etag'],
+                'last_modified': probe['last_modified'],
+                'source': probe['head']
+            }
+        if verdict == 'skip':
+            self.pdf_screen.stats['skipped'] += 1
+            Actor.log.info(f"🙈 Skipping PDF ({reason}, {probe['size'] or 'unknown'} bytes): {pdf_url}")
+            self.pdf_screen.remember(pdf_url, reason, probe['size'])
+            return PdfWorkQueue.skipped(pdf_url, f"Pre-screen: {reason}"), None
+        if probe['size'] and not self.pdf_queue.fits(probe['size']):
+            self.metrics.incr('pdfs_over_budget')
+            Actor.log.info(f"💸 PDF of {probe['size']} bytes does not fit the remaining budget: {pdf_url}")
+            return PdfWorkQueue.skipped(pdf_url, 'PDF byte budget exhausted'), None
+        if verdict == 'defer' and not deferred:
+            self.pdf_screen.stats['deferred'] += 1
+            Actor.log.info(f"⏳ Deferring PDF ({reason}, {probe['size']} bytes): {pdf_url}")
+            raise _PdfDeferred()
+        return None, None
+    
+    async def _extract_pdf_text(self, pdf_url, deferred=False):
+        """Extract text from PDF file with multiple methods"""
+        try:
+            # Revalidate against the cache when possible; otherwise look at the document before paying for all of it
+            headers = await self.pdf_cache.conditional_headers(pdf_url)
+            download = None
+            if self.pdf_prescreen and not headers:
+                skipped, download = await self._screen_pdf(pdf_url, deferred)
+                if skipped is not None:
+                    return skipped
             
-            # Method 2: Try PyPDF2 (fallback)
-            if PDF_AVAILABLE and not extracted_text:
-                try:
-                    Actor.log.info("🔧 Trying PyPDF2 extraction...")
-                    with io.BytesIO(pdf_content) as pdf_file:
-                        pdf_reader = PyPDF2.PdfReader(pdf_file)
-                        text_parts = []
-                        
-                        for page_num in range(min(len(pdf_reader.pages), 20)):  # Limit to 20 pages
-                            page = pdf_reader.pages[page_num]
-                            page_text = page.extract_text()
-                            if page_text:
-                                text_parts.append(page_text)
-                        
-                        if text_parts:
-                            extracted_text = '\n'.join(text_parts)
-                            Actor.log.info(f"✅ PyPDF2 extracted {len(extracted_text)} characters")
-                except Exception as e:
-                    Actor.log.warning(f"⚠️ PyPDF2 failed: {str(e)}")
+            if download is None:
+                Actor.log.info(f"📄 Downloading PDF: {pdf_url}")
+                download = await self.fetcher.request(pdf_url, self._download_pdf, headers, track_latency=False)
+                if download is None:
+                    return None
+                if not download['not_modified']:
+                    self.pdf_queue.charge(download['size'])
+            
+            if download['not_modified']:
+                cached = await self.pdf_cache.get_unchanged(pdf_url)
+                if cached is not None:
+                    Actor.log.info(f"🗄️ PDF not modified, using cached text: {pdf_url}")
+                    return dict(cached, pdf_url=pdf_url, cache='revalidated')
+                # Cache entry vanished between lookup and response; fetch unconditionally
+                download = await self.fetcher.request(pdf_url, self._download_pdf, track_latency=False)
+                if download is None:
+                    return None
+                self.pdf_queue.charge(download['size'])
+            
+            pdf_source = download['source']
+            Actor.log.info(f"✅ Downloaded PDF: {download['size']} bytes{' (spooled to disk)' if isinstance(pdf_source, str) else ''}")
+            
+            try:
+                # Same bytes seen before (possibly under another URL) need no parsing
+                cached = await self.pdf_cache.get_by_hash(pdf_url, download['sha256'], download['etag'], download['last_modified'])
+                if cached is not None:
+                    Actor.log.info(f"🗄️ PDF content already extracted, using cached text: {pdf_url}")
+                    return dict(cached, pdf_url=pdf_url, cache='hit')
+                
+                # Parse in the process pool so the event loop keeps serving other pages
+                with self.metrics.timer('pdf_parse'):
+                    parsed = await self.pdf_pool.extract(pdf_source)
+            finally:
+                if isinstance(pdf_source, str):
+                    os.unlink(pdf_source)
+                del pdf_source
+            
+            for error in parsed['errors']:
+                Actor.log.warning(f"⚠️ {error}")
+            
+            extracted_text = parsed['text']
+            self.metrics.incr('pdf_pages_parsed', parsed['pages'])
+            if extracted_text:
+                self.metrics.incr('pdfs_extracted')
+                Actor.log.info(f"✅ {parsed['method']} extracted {len(extracted_text)} characters from {parsed['pages']} pages")
+            else:
+                self.metrics.incr('pdfs_without_text')
             
             if extracted_text:
-                # Clean and limit text
-                extracted_text = ' '.join(extracted_text.split())  # Remove extra whitespace
-                extracted_text = extracted_text[:5000] if len(extracted_text) > 5000 else extracted_text
+                # Workers return whitespace-collapsed text that may run past the budget by up to a page
+                extracted_text = extracted_text[:self.pdf_max_chars]
                 
-                return {
+                result = {
                     'pdf_url': pdf_url,
                     'pdf_text': extracted_text,
                     'pdf_text_length': len(extracted_text),
-                    'extraction_method': 'pdfplumber' if PDFPLUMBER_AVAILABLE else 'PyPDF2',
-                    'extracted_at': datetime.now().isoformat()
+                    'extraction_method': parsed['method'],
+                    'extracted_at': datetime.now().isoformat(),
+                    'content_hash': download['sha256']
                 }
             else:
                 Actor.log.warning(f"⚠️ No text extracted from PDF: {pdf_url}")
-                return {
+                self.pdf_screen.remember(pdf_url, 'no text extracted', download['size'])
+                result = {
                     'pdf_url': pdf_url,
                     'pdf_text': '',
                     'pdf_text_length': 0,
                     'extraction_method': 'failed',
-                    'error': 'No text could be extracted'
+                    'error': 'No text could be extracted',
+                    'content_hash': download['sha256']
                 }
+            
+            # Parse outcomes depend only on the bytes, so both are worth caching
+            await self.pdf_cache.put(pdf_url, download['sha256'], result, download['etag'], download['last_modified'])
+            return dict(result, cache='miss')
                 
+        except _PdfDeferred:
+            raise
         except Exception as e:
+            self.metrics.incr('pdfs_failed')
             Actor.log.error(f"❌ PDF extraction failed for {pdf_url}: {str(e)}")
             return {
                 'pdf_url': pdf_url,
@@ -160,30 +2777,27 @@ class MRPLScraperV4_WithPDF:
                 'error': str(e)
             }
     
-    async def discover_urls(self):
-        """Discover actual URLs from the main page"""
+    async def discover_urls(self, seed=None):
+        """Discover actual URLs from the main page (the startup seed when there is one)"""
         Actor.log.info("🔍 DISCOVERING ACTUAL MRPL URLS...")
         
         try:
-            response = self.session.get('https://mrpl.co.in/en/', timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if seed is None:
+                home_url = self.profile.home_url(self.base_url)
+                response = await self.fetch(home_url, timeout=30)
+                response.raise_for_status()
+                seed = {'home_url': home_url, 'content': response.content, 'encoding': self._declared_encoding(response)}
+            home_url = seed['home_url']
             
-            # Find all internal links
-            discovered_urls = set()
-            discovered_urls.add('https://mrpl.co.in/en/')  # Add main page
+            page = self.page_parser.parse(seed['content'], seed['encoding'])
             
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                if href.startswith('/') and len(href) > 1:
-                    full_url = 'https://mrpl.co.in' + href
-                    discovered_urls.add(full_url)
+            # Find all internal links (canonical, deduplicated, without PDFs and other files)
+            internal_links = self.links.extract(home_url, page['hrefs'])[0]
             
-            # Convert to list and limit
-            url_list = list(discovered_urls)[:self.max_pages]
+            # Main page first; the frontier decides what to crawl from the rest
+            url_list = [home_url] + sorted(internal_links)
             
-            Actor.log.info(f"✅ Discovered {len(discovered_urls)} total URLs, using first {len(url_list)}")
+            Actor.log.info(f"✅ Discovered {len(url_list)} seed URLs")
             for i, url in enumerate(url_list[:5]):  # Log first 5
                 Actor.log.info(f"   {i+1}. {url}")
             
@@ -191,176 +2805,628 @@ class MRPLScraperV4_WithPDF:
             
         except Exception as e:
             Actor.log.error(f"❌ URL discovery failed: {str(e)}")
-            # Fallback to known working URLs
-            return [
-                'https://mrpl.co.in/en/',
-                'https://mrpl.co.in/Parent/About_us',
-                'https://mrpl.co.in/Content/Vision_and_Mission',
-                'https://mrpl.co.in/Parent/Organization',
-                'https://mrpl.co.in/Content/History'
-            ]
+            # Fallback to the profile's seed pages
+            return [self.profile.home_url(self.base_url)] + self.profile.seed_urls(self.base_url)
+    
+    def _read_feed(self, feed_url):
+        """Blocking, streamed read of one sitemap or feed into (kind, url, lastmod) entries"""
+        entries = []
+        with self.session.get(feed_url, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            try:
+                for entry in iter_feed_entries(response.iter_content(chunk_size=64 * 1024)):
+                    entries.append(entry)
+            except ElementTree.ParseError as e:
+                # Keep whatever parsed before the document broke off (or turned out to be HTML)
+                Actor.log.warning(f"⚠️ Malformed XML in {feed_url} after {len(entries)} entries: {str(e)}")
+        return entries
+    
+    def _on_base(self, url):
+        """Move a URL on the site's own host onto the base URL being crawled.
+
+        Sitemaps list the canonical host, which for a mirror is one of the profile's
+        ``domains``. Only the base host, those exact hosts and their www. variants are
+        moved; other subdomains (tenders.mrpl.co.in) are different sites and keep theirs.
+        """
+        parts = urlsplit(url)
+        base = urlsplit(self.base_url)
+        host = parts.netloc.lower().removeprefix('www.')
+        if host != base.netloc.lower().removeprefix('www.') and host not in self.profile.domains:
+            return urlunsplit((parts.scheme, parts.netloc, parts.path or '/', parts.query, ''))
+        return urlunsplit((base.scheme, base.netloc, parts.path or '/', parts.query, ''))
+    
+    async def _feed_sources(self, seed):
+        """Sitemaps and feeds to read: the profile's, robots.txt Sitemap lines and feeds linked from the home page"""
+        sources = [self.profile.url(path, self.base_url) for path in self.profile.sitemaps + self.profile.feeds]
+        try:
+            response = await self.fetch(f"{self.base_url}/robots.txt", timeout=15)
+            if response.status_code == 200:
+                for line in response.text.splitlines():
+                    name, _, value = line.partition(':')
+                    if name.strip().lower() == 'sitemap' and value.strip():
+                        sources.append(urljoin(self.base_url + '/', value.strip()))
+        except Exception as e:
+            Actor.log.warning(f"⚠️ Could not read robots.txt: {str(e)}")
+        
+        if seed is not None:
+            for tag in FEED_LINK.findall(seed['content']):
+                href = FEED_HREF.search(tag)
+                if href:
+                    sources.append(urljoin(seed['home_url'], href.group(1).decode('utf-8', 'replace')))
+        
+        if not sources:
+            # Nothing points anywhere else: try the conventional location
+            sources.append(f"{self.base_url}/sitemap.xml")
+        return [self._on_base(url) for url in dict.fromkeys(sources) if self.profile.is_internal(url)]
+    
+    async def discover_from_feeds(self, seed=None):
+        """{url: lastmod or None} for the pages listed in the site's sitemaps and feeds.
+
+        Sitemap indexes are followed (up to FEED_MAX_DOCUMENTS documents in
+        all) and every document is parsed as it streams in. A URL listed
+        more than once keeps its newest lastmod.
+        """
+        Actor.log.info("🗺️ READING SITEMAPS AND FEEDS...")
+        pending = await self._feed_sources(seed)
+        read = set()
+        entries = {}
+        while pending and len(read) < FEED_MAX_DOCUMENTS:
+            feed_url = pending.pop(0)
+            if feed_url in read:
+                continue
+            read.add(feed_url)
+            try:
+                with self.metrics.timer('feed_read'):
+                    items = await self.fetcher.request(feed_url, self._read_feed)
+            except Exception as e:
+                Actor.log.warning(f"⚠️ Could not read {feed_url}: {str(e)}")
+                continue
+            
+            for kind, url, lastmod in items:
+                url = urljoin(feed_url, url)
+                if not self.profile.is_internal(url):
+                    continue
+                url = self._on_base(url)
+                if kind == 'sitemap':
+                    pending.append(url)
+                elif url not in entries or (lastmod and (entries[url] is None or lastmod > entries[url])):
+                    entries[url] = lastmod
+            Actor.log.info(f"🗺️ {len(items)} entries in {feed_url}")
+        
+        Actor.log.info(f"✅ {len(entries)} URLs from {len(read)} sitemaps/feeds")
+        return entries
+    
+    # lastmod age in days -> priority boost; recently changed pages are crawled first
+    RECENCY_BOOSTS = ((7, 3.0), (30, 2.0), (365, 1.0))
+    
+    def _queue_feed_entries(self, entries):
+        """Queue sitemap/feed URLs by recency; in incremental mode skip those not modified since they were last checked"""
+        now = datetime.now()
+        queued = unchanged = 0
+        skipped = []
+        for url, lastmod in entries.items():
+            previous = self.page_state.get(url)
+            if lastmod and previous and previous.get('checked_at') and lastmod <= datetime.fromisoformat(previous['checked_at']):
+                self.frontier.skip(url)
+                self.page_state.count('unchanged')
+                # Recorded once the dataset writer runs, like pages found unchanged by a request
+                self._lastmod_unchanged.append(url)
+                skipped.append(previous)
+                unchanged += 1
+                continue
+            boost = 0.0
+            if lastmod is not None:
+                age = (now - lastmod).days
+                boost = next((weight for days, weight in self.RECENCY_BOOSTS if age <= days), 0.0)
+            queued += self.frontier.add(url, depth=1, boost=boost)
+        
+        # Skipped pages were not fetched, so crawl on from the links stored last run, as for unchanged pages;
+        # after the loop, so their children never pre-empt sitemap entries and their recency boosts
+        for previous in skipped:
+            self._expand_links(previous.get('links', []), 1, previous.get('pdf_link_count', 0))
+        
+        self.metrics.incr('sitemap_urls_queued', queued)
+        self.metrics.incr('sitemap_urls_unchanged', unchanged)
+        Actor.log.info(f"🗺️ Queued {queued} sitemap/feed URLs, skipped {unchanged} unchanged since the last run")
+        return queued
+    
+    async def _probe(self, url):
+        """GET a start URL; returns the response if it is a 200 with MRPL content"""
+        Actor.log.info(f"🧪 Testing: {url}")
+        response = await self.fetch(url, timeout=15)
+        if response.status_code != 200:
+            raise ValueError(f"Got status {response.status_code} from {url}")
+        Actor.log.info(f"✅ SUCCESS! Status: {response.status_code}, Size: {len(response.content)} bytes")
+        
+        # Validate content
+        if not self.profile.looks_like_site(response.content):
+            raise ValueError(f"Content validation failed for {url}")
+        Actor.log.info("✅ Content validation passed - contains MRPL content")
+        return response
     
     async def test_connection(self):
-        """Test connection to MRPL website"""
+        """Race the start URLs; the first valid response wins (None if every probe fails)"""
         Actor.log.info("🔧 TESTING CONNECTION TO MRPL...")
         
-        test_urls = [
-            'https://mrpl.co.in/en/',
-            'https://mrpl.co.in/',
-            'http://mrpl.co.in/en/',
-            'http://mrpl.co.in/'
-        ]
+        # The fetch layer falls back to HTTP by itself when HTTPS cannot connect
+        start_urls = dict.fromkeys([self.profile.home_url(self.base_url), f"{self.base_url}/"])
+        probes = [asyncio.ensure_future(self._probe(url)) for url in start_urls]
+        try:
+            for probe in asyncio.as_completed(probes):
+                try:
+                    response = await probe
+                except Exception as e:
+                    Actor.log.warning(f"❌ Connection failed: {str(e)}")
+                    continue
+                # Build page URLs with the scheme that actually connected
+                self.base_url = self.fetcher.resolve(self.base_url)
+                return response
+        finally:
+            for probe in probes:
+                probe.cancel()
         
-        for url in test_urls:
+        return None
+    
+    async def start(self):
+        """Connect and return the discovery seed {'home_url', 'content', 'encoding'}, or None.
+
+        A warm start revalidates the home page saved by the previous run with
+        one conditional GET; otherwise (or if that fails) the start URLs are
+        probed concurrently. A freshly downloaded home page is also handed to
+        scrape_page so it is not fetched twice.
+        """
+        cached = await self.startup_cache.load()
+        if cached and urlsplit(cached['base_url']).netloc.lower() == self.base_host:
+            headers = {}
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
             try:
-                Actor.log.info(f"🧪 Testing: {url}")
-                response = self.session.get(url, timeout=15)
-                
+                Actor.log.info(f"♨️ Warm start from {cached['base_url']}")
+                response = await self.fetch(cached['home_url'], timeout=15, headers=headers)
+                if response.status_code == 304:
+                    self.base_url = self.fetcher.resolve(cached['base_url'])
+                    Actor.log.info("♨️ Home page not modified, reusing the saved copy")
+                    return {key: cached[key] for key in ('home_url', 'content', 'encoding')}
+                if response.status_code == 200 and self.profile.looks_like_site(response.content):
+                    self.base_url = self.fetcher.resolve(cached['base_url'])
+                    return await self._seed_from(cached['home_url'], response)
                 if response.status_code == 200:
-                    content_size = len(response.content)
-                    Actor.log.info(f"✅ SUCCESS! Status: {response.status_code}, Size: {content_size} bytes")
-                    
-                    # Validate content
-                    if 'mrpl' in response.text.lower() or 'mangalore' in response.text.lower():
-                        Actor.log.info("✅ Content validation passed - contains MRPL content")
-                        return True
-                    else:
-                        Actor.log.warning("⚠️ Content validation failed")
+                    # Maintenance or WAF pages must not become the seed (or the next warm start)
+                    Actor.log.warning("⚠️ Warm start page failed content validation, probing instead")
                 else:
-                    Actor.log.warning(f"⚠️ Got status {response.status_code}")
-                    
+                    Actor.log.warning(f"⚠️ Warm start got status {response.status_code}, probing instead")
             except Exception as e:
-                Actor.log.warning(f"❌ Connection failed: {str(e)}")
-                continue
+                Actor.log.warning(f"⚠️ Warm start failed, probing instead: {str(e)}")
         
-        return False
+        response = await self.test_connection()
+        if response is None:
+            return None
+        return await self._seed_from(self.fetcher.resolve(response.url), response)
+    
+    async def _seed_from(self, home_url, response):
+        seed = {'home_url': home_url, 'content': response.content, 'encoding': self._declared_encoding(response)}
+        self._prefetched[normalize_url(home_url)] = response
+        try:
+            await self.startup_cache.save(
+                self.base_url, home_url, response.content, seed['encoding'],
+                response.headers.get('ETag'), response.headers.get('Last-Modified')
+            )
+        except Exception as e:
+            Actor.log.warning(f"⚠️ Could not save the startup cache: {str(e)}")
+        return seed
     
-    async def scrape_page(self, url):
-        """Scrape a single page with PDF text extraction"""
+    async def scrape_page(self, url, depth=0):
+        """Scrape a single page with PDF text extraction.
+
+        Runs in stages: fetch and parse into a compact PageRecord (the
+        response body and parse tree are released there, before any PDF
+        work), change detection and link expansion, then PDF extraction and
+        the dataset record. The page workers run the last two in the
+        background (_complete_page) so they can move on to the next page.
+        """
+        timings = {}
+        page = await self._process_page(url, depth, timings)
+        if not isinstance(page, PageRecord):
+            return page
+        return await self._finish_page(page, timings)
+    
+    async def _process_page(self, url, depth, timings):
+        """Page stages up to link expansion: a PageRecord still waiting for its PDFs, a final record, or None"""
         try:
             Actor.log.info(f"🌐 Scraping: {url}")
             
-            response = self.session.get(url, timeout=30)
-            
-            if response.status_code != 200:
-                Actor.log.warning(f"⚠️ HTTP {response.status_code} for {url}")
-                return None
+            previous = self.page_state.get(url)
+            page = await self._load_page(url, depth, previous, timings)
+            if not isinstance(page, PageRecord):
+                return page  # None, or an unchanged/duplicate record
             
-            # Parse content
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Dynamic markup (tokens, timestamps) can change while the content does not
+            page.fingerprint = content_fingerprint(page.title, page.description, page.web_content, sorted(page.pdf_links))
+            if previous and previous.get('fingerprint') == page.fingerprint:
+                self.page_state.update(url, fingerprint=page.fingerprint, **page.validators)
+                return self._unchanged_record(url, depth, previous, page.status_code, 'same content')
+            page.change_status = 'changed' if previous else 'new'
             
-            # Extract title
-            title_elem = soup.find('title')
-            title = title_elem.get_text().strip() if title_elem else 'No title'
+            self._expand_links(page.internal_links, depth, len(page.pdf_links))
+            return page
             
-            # Extract meta description
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            description = meta_desc.get('content', '') if meta_desc else ''
+        except Exception as e:
+            Actor.log.error(f"❌ Error scraping {url}: {str(e)}")
+            return None
+    
+    async def _finish_page(self, page, timings):
+        """PDF and record stages: the page's dataset record once all its PDFs are done, or None"""
+        try:
+            pdf_documents = await self._extract_page_pdfs(page, timings)
+            if self.search_index is not None:
+                self.search_index.add_page(page, pdf_documents)
+            if self.output_mode == 'normalized':
+                pdf_documents = [await self._pdf_reference(doc) for doc in pdf_documents]
             
-            # Extract main content
-            content_selectors = [
-                '.main-content', '.content', 'main', '.page-content', 'article', '.container', 'body'
-            ]
+            result = self._page_result(page, pdf_documents)
+            if self.metrics_per_page:
+                result['timings'] = timings
+            if self.page_state.enabled:
+                result['change_status'] = page.change_status
+                self.page_state.update(
+                    page.url, fingerprint=page.fingerprint, links=list(dict.fromkeys(page.internal_links)),
+                    pdf_link_count=len(page.pdf_links), **page.validators
+                )
+                self.page_state.count(page.change_status)
             
-            content = ''
-            for selector in content_selectors:
-                content_elem = soup.select_one(selector)
-                if content_elem:
-                    content = content_elem.get_text(strip=True)
-                    break
+            Actor.log.info(f"✅ Successfully scraped: {page.title[:50]}...")
+            Actor.log.info(f"📊 Web content: {len(page.web_content)} chars, PDFs: {len(pdf_documents)}, Total text: {result['total_text_length']} chars")
             
-            # If no specific content found, get body text
-            if not content:
-                body = soup.find('body')
-                if body:
-                    content = body.get_text(strip=True)
+            return result
             
-            # Clean and limit content
-            content = ' '.join(content.split())  # Remove extra whitespace
-            web_content = content[:3000] if len(content) > 3000 else content
+        except Exception as e:
+            Actor.log.error(f"❌ Error scraping {page.url}: {str(e)}")
+            return None
+    
+    async def _load_page(self, url, depth, previous, timings):
+        """Fetch and parse stage: a PageRecord, an early unchanged/duplicate record, or None.
+
+        The response and the parsed page only live inside this call.
+        """
+        with self.metrics.timer('page_fetch', timings):
+            # The home page may already have been downloaded at startup
+            response = self._prefetched.pop(normalize_url(url), None)
+            if response is None:
+                response = await self.fetch(url, timeout=30, headers=self.page_state.conditional_headers(url))
+        # Connect + time to first byte; requests does not split DNS/connect further
+        self.metrics.observe('page_ttfb', response.elapsed.total_seconds(), timings)
+        self.metrics.incr('bytes_html', len(response.content))
+        
+        if response.status_code == 304 and previous:
+            # A 304 may carry refreshed validators; the stored ones it omits stay valid
+            refreshed = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+            self.page_state.update(url, **{key: value for key, value in refreshed.items() if value})
+            return self._unchanged_record(url, depth, previous, response.status_code, 'not modified')
+        
+        if response.status_code != 200:
+            Actor.log.warning(f"⚠️ HTTP {response.status_code} for {url}")
+            return None
+        
+        # Identical bytes need no parsing at all
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body_hash': body_hash
+        }
+        if previous and previous.get('body_hash') == body_hash:
+            self.page_state.update(url, **validators)
+            return self._unchanged_record(url, depth, previous, response.status_code, 'identical body')
+        
+        # Parse content in a single pass
+        with self.metrics.timer('html_parse', timings):
+            parsed = self.page_parser.parse(response.content, self._declared_encoding(response))
+        
+        # Clean and limit content
+        content = ' '.join(parsed['content'].split())  # Remove extra whitespace
+        page = PageRecord(
+            url=url,
+            depth=depth,
+            title=parsed['title'],
+            description=parsed['description'],
+            web_content=content[:3000] if len(content) > 3000 else content,
+            status_code=response.status_code,
+            page_size_bytes=len(response.content),
+            validators=validators
+        )
+        
+        # Extract links
+        with self.metrics.timer('link_extraction', timings):
+            page.internal_links, page.external_links, page.pdf_links = self.links.extract(url, parsed['hrefs'])
+        
+        # Template pages, language variants and query-string copies: record and stop here.
+        # The whole cleaned text is compared, not the stored prefix, which a shared header can fill
+        if self.near_duplicates is not None:
+            with self.metrics.timer('dedup', timings):
+                duplicate = self.near_duplicates.check(url, content, page.pdf_links)
+            if duplicate:
+                return self._duplicate_record(url, page.title, page.status_code, *duplicate)
+        return page
+    
+    async def _extract_page_pdfs(self, page, timings):
+        """PDF stage: extraction results for every PDF the page links to"""
+        pdf_documents = []
+        if self.extract_pdfs and page.pdf_links:
+            pdf_urls = list(dict.fromkeys(page.pdf_links))
+            Actor.log.info(f"📋 Found {len(pdf_urls)} PDFs, queued for text extraction")
             
-            # Extract links
-            internal_links = []
-            external_links = []
-            pdf_links = []
+            # All of them go on the shared queue at once; its concurrency and byte budget set the pace
+            with self.metrics.timer('page_pdfs', timings):
+                results = await asyncio.gather(*(self.extract_pdf_text(pdf_url) for pdf_url in pdf_urls))
+            pdf_documents = [pdf_data for pdf_data in results if pdf_data]
+        return pdf_documents
+    
+    def _page_result(self, page, pdf_documents):
+        """Dataset record for a fully processed page"""
+        # Combine all text content (PDF text lives in the referenced records in normalized mode)
+        all_text_content = page.web_content
+        if pdf_documents and self.output_mode != 'normalized':
+            pdf_texts = [doc['pdf_text'] for doc in pdf_documents if doc['pdf_text']]
+            if pdf_texts:
+                all_text_content += '\n\n--- PDF CONTENT ---\n\n' + '\n\n'.join(pdf_texts)
+        
+        return {
+            'url': page.url,
+            'title': page.title,
+            'description': page.description,
+            'web_content': page.web_content,
+            'web_content_length': len(page.web_content),
+            'pdf_documents': pdf_documents,
+            'pdf_count': len(pdf_documents),
+            'all_text_content': all_text_content,
+            'total_text_length': len(all_text_content),
+            'internal_links': page.internal_links[:15],
+            'external_links': page.external_links[:5],
+            'pdf_links': page.pdf_links,
+            'scraped_at': datetime.now().isoformat(),
+            'total_links': len(page.internal_links) + len(page.external_links),
+            'status_code': page.status_code,
+            'page_size_bytes': page.page_size_bytes
+        }
+    
+    async def _pdf_reference(self, pdf_data):
+        """Store a PDF's text once per content hash and return the page-side reference"""
+        content_hash = pdf_data.get('content_hash')
+        if not content_hash or not pdf_data.get('pdf_text'):
+            # Failures and empty documents carry no text worth normalizing
+            return pdf_data
+        
+        document_key = f"PDF-{content_hash}"
+        if content_hash not in self._pdf_documents_stored:
+            self._pdf_documents_stored.add(content_hash)
+            try:
+                await Actor.set_value(document_key, {
+                    'content_hash': content_hash,
+                    'pdf_url': pdf_data['pdf_url'],
+                    'pdf_text': pdf_data['pdf_text'],
+                    'pdf_text_length': pdf_data['pdf_text_length'],
+                    'extraction_method': pdf_data.get('extraction_method'),
+                    'extracted_at': pdf_data.get('extracted_at')
+                })
+                self.metrics.incr('pdf_documents_stored')
+            except Exception:
+                self._pdf_documents_stored.discard(content_hash)
+                raise
+        else:
+            self.metrics.incr('pdf_documents_referenced')
+        
+        reference = {key: value for key, value in pdf_data.items() if key != 'pdf_text'}
+        reference['document_key'] = document_key
+        return reference
+    
+    @staticmethod
+    def _declared_encoding(response):
+        """Charset from the Content-Type header, if any; otherwise the parser sniffs the meta tag"""
+        content_type = response.headers.get('content-type', '')
+        return requests.utils.get_encoding_from_headers({'content-type': content_type}) if 'charset' in content_type.lower() else None
+    
+    def _expand_links(self, internal_links, depth, pdf_link_count):
+        """Queue a page's internal links one level deeper, boosting children of PDF-rich pages"""
+        if self.frontier is None:
+            return
+        boost = min(pdf_link_count, 10) * 0.2
+        queued = sum(self.frontier.add(link, depth + 1, boost) for link in internal_links)
+        if queued:
+            Actor.log.info(f"🧭 Queued {queued} new URLs at depth {depth + 1} ({len(self.frontier)} in frontier)")
+    
+    async def save_metrics(self):
+        """Write the run's stage/counter summary to the default key-value store as RUN_METRICS"""
+        summary = self.metrics.summary(
+            pages_scraped=getattr(self, 'pages_scraped', 0),
+            pdf_cache=dict(self.pdf_cache.stats) if self.pdf_cache.enabled else None,
+            pdf_parse_timeouts=self.pdf_pool.timeouts,
+            page_changes=dict(self.page_state.counts) if self.page_state.enabled else None,
+            near_duplicates=dict(self.near_duplicates.stats) if self.near_duplicates else None,
+            links=dict(self.links.stats),
+            pdf_queue=dict(self.pdf_queue.stats, bytes_downloaded=self.pdf_queue.bytes_used, byte_budget=self.pdf_queue.byte_budget),
+            pdf_prescreen=dict(self.pdf_screen.stats) if self.pdf_prescreen else None,
+            export=dict(self.exporter.sizes(), format=self.exporter.format, records=self.exporter.manifest['records']) if self.exporter else None,
+            search_index=dict(self.search_index.stats, documents=len(self.search_index)) if self.search_index else None,
+            memory=dict(self.memory.stats, budget_mb=self.memory.budget_bytes // (1024 * 1024) if self.memory.budget_bytes else None),
+            rate_limiter=self.rate_limiter.stats()
+        )
+        await Actor.set_value('RUN_METRICS', summary)
+        
+        slowest = sorted(summary['stages'].items(), key=lambda item: item[1]['total_s'], reverse=True)[:4]
+        Actor.log.info("⏱️ Time per stage: " + ', '.join(f"{stage} {stats['total_s']}s (p95 {stats['p95_ms']}ms)" for stage, stats in slowest))
+        return summary
+    
+    def _duplicate_record(self, url, title, status_code, duplicate_of, distance):
+        """Lightweight record for a page whose content nearly matches an earlier one; its PDFs and links are skipped"""
+        Actor.log.info(f"👯 Near-duplicate of {duplicate_of} ({distance} bits), skipping: {url}")
+        self.metrics.incr('pages_near_duplicate')
+        return {
+            'url': url,
+            'title': title,
+            'duplicate_of': duplicate_of,
+            'simhash_distance': distance,
+            'status_code': status_code,
+            'scraped_at': datetime.now().isoformat()
+        }
+    
+    def _unchanged_record(self, url, depth, previous, status_code, reason):
+        """Lightweight record for a page that did not change since the last run"""
+        Actor.log.info(f"⏭️ Unchanged ({reason}), skipping: {url}")
+        self.page_state.count('unchanged')
+        
+        # Its links were not re-parsed, so crawl on from the ones stored last run
+        self._expand_links(previous.get('links', []), depth, previous.get('pdf_link_count', 0))
+        return {
+            'url': url,
+            'change_status': 'unchanged',
+            'status_code': status_code,
+            'checked_at': datetime.now().isoformat()
+        }
+    
+    async def _page_worker(self):
+        """Pull URLs off the frontier until it runs dry; pacing is left to the rate limiter"""
+        while True:
+            item = await self.frontier.next()
+            if item is None:
+                return
+            url, depth = item
+            self.crawl_state.started(url, depth)
+            await self.memory.admit()
             
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                if href:
-                    # Handle relative URLs
-                    if href.startswith('/'):
-                        absolute_url = 'https://mrpl.co.in' + href
-                    elif href.startswith('http'):
-                        absolute_url = href
-                    else:
-                        absolute_url = requests.compat.urljoin(url, href)
-                    
-                    if href.lower().endswith('.pdf'):
-                        pdf_links.append(absolute_url)
-                    elif 'mrpl.co.in' in absolute_url:
-                        internal_links.append(absolute_url)
-                    elif href.startswith('http'):
-                        external_links.append(absolute_url)
-            
-            # Extract PDF text if enabled
-            pdf_documents = []
-            if self.extract_pdfs and pdf_links:
-                Actor.log.info(f"📋 Found {len(pdf_links)} PDFs, extracting text...")
+            completing = False
+            try:
+                Actor.log.info(f"📄 Processing page {self.frontier.dispatched}/{self.max_pages} (depth {depth}): {url}")
                 
-                for pdf_url in pdf_links[:5]:  # Limit to 5 PDFs per page
-                    pdf_data = await self.extract_pdf_text(pdf_url)
-                    if pdf_data:
-                        pdf_documents.append(pdf_data)
-                        
-                        # Small delay between PDF downloads
-                        if len(pdf_documents) < len(pdf_links[:5]):
-                            time.sleep(1)
-            
-            # Combine all text content
-            all_text_content = web_content
-            if pdf_documents:
-                pdf_texts = [doc['pdf_text'] for doc in pdf_documents if doc['pdf_text']]
-                if pdf_texts:
-                    all_text_content += '\n\n--- PDF CONTENT ---\n\n' + '\n\n'.join(pdf_texts)
-            
-            # Create result
-            result = {
-                'url': url,
-                'title': title,
-                'description': description,
-                'web_content': web_content,
-                'web_content_length': len(web_content),
-                'pdf_documents': pdf_documents,
-                'pdf_count': len(pdf_documents),
-                'all_text_content': all_text_content,
-                'total_text_length': len(all_text_content),
-                'internal_links': internal_links[:15],
-                'external_links': external_links[:5],
-                'pdf_links': pdf_links,
-                'scraped_at': datetime.now().isoformat(),
-                'total_links': len(internal_links) + len(external_links),
-                'status_code': response.status_code,
-                'page_size_bytes': len(response.content)
-            }
-            
-            Actor.log.info(f"✅ Successfully scraped: {title[:50]}...")
-            Actor.log.info(f"📊 Web content: {len(web_content)} chars, PDFs: {len(pdf_documents)}, Total text: {len(all_text_content)} chars")
-            
-            return result
+                timings = {}
+                with self.metrics.timer('page_total'):
+                    page = await self._process_page(url, depth, timings)
+                
+                if isinstance(page, PageRecord):
+                    # Its PDFs finish in the background; links are already queued, so the next page can start
+                    task = asyncio.create_task(self._complete_page(page, timings))
+                    self._completions.add(task)
+                    task.add_done_callback(self._completions.discard)
+                    completing = True
+                else:
+                    await self._record_page(url, page)
+            finally:
+                if not completing:
+                    self.memory.release()
+                self.frontier.done()
+    
+    async def _complete_page(self, page, timings):
+        """Background completion of a page: wait for its PDFs, then record it"""
+        try:
+            await self._record_page(page.url, await self._finish_page(page, timings))
+        finally:
+            self.memory.release()
+    
+    async def _record_page(self, url, page_data):
+        """Hand a page's outcome to the dataset writer and the crawl state"""
+        if page_data and page_data.get('change_status') == 'unchanged':
+            self.metrics.incr('pages_unchanged')
+            if self.emit_unchanged:
+                self.crawl_state.queued(url, 'unchanged')
+                await self.writer.push(page_data)
+            else:
+                self.crawl_state.finished(url, 'unchanged')
+        elif page_data and page_data.get('duplicate_of'):
+            if self.search_index is not None:
+                self.search_index.remove(url)
+            self.crawl_state.queued(url, 'duplicate')
+            await self.writer.push(page_data)
+        elif page_data:
+            # Queue data for the Apify dataset
+            self.crawl_state.queued(url, 'scraped', page_data.get('pdf_count', 0))
+            await self.writer.push(page_data)
+            self.metrics.incr('pages_scraped')
+            self.pages_scraped += 1
+            self.total_pdfs_processed += page_data.get('pdf_count', 0)
             
+            Actor.log.info(f"📊 Page completed - Web: {page_data['web_content_length']} chars, PDFs: {page_data['pdf_count']}")
+        else:
+            self.metrics.incr('pages_failed')
+            self.crawl_state.finished(url, 'failed')
+            Actor.log.warning(f"⚠️ Failed to scrape: {url}")
+    
+    def _pdf_results(self):
+        """Finished in-run PDF extractions worth carrying over to a resumed run"""
+        return {key: result for key, result in self.pdf_queue.results().items() if result and result.get('content_hash')}
+    
+    async def _records_flushed(self, records):
+        """A dataset batch was written: its pages are finished, and it goes on to the export"""
+        # Under the checkpoint lock, so a checkpoint sees each batch in both the crawl state and the export or in neither
+        async with self._checkpoint_lock:
+            self.crawl_state.flushed(records)
+            try:
+                await self.crawl_state.save_flushed()
+            except Exception as e:
+                Actor.log.error(f"❌ Could not record flushed pages: {str(e)}")
+            if self.exporter is not None:
+                try:
+                    await self.exporter.write(records)
+                except Exception as e:
+                    Actor.log.error(f"❌ Export failed for {len(records)} records: {str(e)}")
+    
+    async def _export_recovered(self):
+        """Export the records an interrupted run flushed after its last checkpoint (they are in the dataset, not the export)"""
+        recovered = set(self.crawl_state.recovered)
+        dataset = await Actor.open_dataset()
+        # They are the newest items, give or take the batch in flight when the run stopped
+        page = await dataset.get_data(desc=True, limit=len(recovered) + self.push_batch_size)
+        records = {}
+        for record in page.items:
+            if record.get('url') in recovered and record['url'] not in records:
+                records[record['url']] = record
+        await self.exporter.write(list(reversed(records.values())))
+        Actor.log.info(f"📦 Exported {len(records)} records flushed after the last checkpoint")
+    
+    async def checkpoint(self, finished=False, close_export=True):
+        """Persist crawl progress along with the export, search index, PDF cache and page state.
+
+        Periodic checkpoints (``close_export=False``) only snapshot the export parts in progress.
+        """
+        # The export and the crawl state are saved as of the same moment: no batch lands in between
+        async with self._checkpoint_lock:
+            if self.exporter is not None:
+                try:
+                    await (self.exporter.flush() if close_export else self.exporter.snapshot())
+                except Exception as e:
+                    Actor.log.error(f"❌ Export failed: {str(e)}")
+            await self.crawl_state.save(self.frontier, self._pdf_results(), finished)
+        if self.search_index is not None:
+            try:
+                await self.search_index.save()
+            except Exception as e:
+                Actor.log.error(f"❌ Search index save failed: {str(e)}")
+        await self.pdf_cache.save()
+        await self.pdf_screen.save()
+        await self.page_state.save()
+    
+    async def _checkpoint_listener(self, event_data=None, close_export=False):
+        try:
+            await self.checkpoint(close_export=close_export)
+            Actor.log.info(f"💾 Crawl state checkpointed ({len(self.crawl_state.pages)} pages done)")
         except Exception as e:
-            Actor.log.error(f"❌ Error scraping {url}: {str(e)}")
-            return None
+            Actor.log.error(f"❌ Checkpoint failed: {str(e)}")
+    
+    async def _last_checkpoint_listener(self, event_data=None):
+        """Migration or abort: the run may not come back, so close the export parts too"""
+        await self._checkpoint_listener(event_data, close_export=True)
     
     async def run(self):
         """Run the scraper with comprehensive testing and PDF extraction"""
         Actor.log.info("🚀 MRPL SCRAPER V4 WITH PDF TEXT EXTRACTION!")
         Actor.log.info("📄 This version extracts text from BOTH web pages AND PDF files!")
-        Actor.log.info(f"⚙️ Configuration: max_pages={self.max_pages}, delay={self.delay}, extract_pdfs={self.extract_pdfs}")
+        Actor.log.info(f"⚙️ Configuration: max_pages={self.max_pages}, delay={self.delay}, extract_pdfs={self.extract_pdfs}, max_concurrency={self.max_concurrency}")
         
         # Check PDF libraries
         if self.extract_pdfs:
-            if PDFPLUMBER_AVAILABLE:
+            if PDFIUM_AVAILABLE:
+                Actor.log.info("✅ pypdfium2 available for fast PDF text extraction")
+            elif PDFPLUMBER_AVAILABLE:
                 Actor.log.info("✅ pdfplumber available for PDF text extraction")
             elif PDF_AVAILABLE:
                 Actor.log.info("✅ PyPDF2 available for PDF text extraction")
@@ -368,47 +3434,144 @@ class MRPLScraperV4_WithPDF:
                 Actor.log.warning("⚠️ No PDF libraries available, will skip PDF text extraction")
                 self.extract_pdfs = False
         
-        # Test connection first
-        if not await self.test_connection():
+        await self.page_state.open()
+        await self.pdf_screen.open()
+        
+        # Connect (warm start or racing probes); the response seeds discovery
+        seed = await self.start()
+        if seed is None:
             Actor.log.error("❌ Could not establish connection to MRPL website")
+            self.close()
             return 0
         
-        # Discover actual URLs
-        urls_to_scrape = await self.discover_urls()
+        self.frontier = CrawlFrontier(self.max_pages, max_depth=self.max_depth, profile=self.profile)
+        restored = await self.crawl_state.load()
+        if restored:
+            # Pick up the interrupted crawl instead of discovering again
+            self.frontier.restore(restored['frontier'])
+            for key, result in restored.get('pdf_results', {}).items():
+                self.pdf_queue.seed(key, result)
+        else:
+            # Discover actual URLs: sitemaps and feeds first, the home page's anchors as the fallback
+            feed_entries = await self.discover_from_feeds(seed) if self.use_sitemaps else {}
+            urls_to_scrape = await self.discover_urls(seed)
+            
+            if not urls_to_scrape:
+                Actor.log.error("❌ No URLs discovered to scrape")
+                self.close()
+                return 0
+            
+            # Seed the frontier: main page at depth 0, then sitemap pages by recency; with those
+            # queued the home page's navigation links rank one level lower
+            self.frontier.add(urls_to_scrape[0], depth=0)
+            anchor_depth = 2 if feed_entries and self._queue_feed_entries(feed_entries) else 1
+            for url in urls_to_scrape[1:]:
+                self.frontier.add(url, depth=anchor_depth)
         
-        if not urls_to_scrape:
-            Actor.log.error("❌ No URLs discovered to scrape")
-            return 0
+        if self.exporter is not None:
+            await self.exporter.open(resumed=bool(restored))
+            if self.crawl_state.recovered:
+                await self._export_recovered()
+        if self.search_index is not None:
+            await self.search_index.open()
         
-        Actor.log.info(f"📋 Will scrape {len(urls_to_scrape)} pages with PDF text extraction")
+        Actor.log.info(f"📋 Will scrape up to {self.max_pages} pages (max depth {self.max_depth}) from {len(self.frontier)} queued URLs")
         
-        # Scrape pages
-        pages_scraped = 0
-        total_pdfs_processed = 0
+        # Scrape pages with up to max_concurrency fetches in flight
+        Actor.log.info(f"🧵 Running {self.max_concurrency} concurrent page workers")
+        self.pages_scraped = self.crawl_state.pages_scraped
+        self.total_pdfs_processed = self.crawl_state.pdfs_processed
         
-        for i, url in enumerate(urls_to_scrape):
-            Actor.log.info(f"📄 Processing page {i+1}/{len(urls_to_scrape)}")
-            
-            page_data = await self.scrape_page(url)
-            
-            if page_data:
-                # Push data to Apify dataset
-                await Actor.push_data(page_data)
-                pages_scraped += 1
-                total_pdfs_processed += page_data.get('pdf_count', 0)
-                
-                Actor.log.info(f"📊 Page {i+1} completed - Web: {page_data['web_content_length']} chars, PDFs: {page_data['pdf_count']}")
-                
-                # Delay between requests (except for last page)
-                if i < len(urls_to_scrape) - 1:
-                    Actor.log.info(f"⏱️ Waiting {self.delay} seconds...")
-                    time.sleep(self.delay)
-            else:
-                Actor.log.warning(f"⚠️ Failed to scrape page {i+1}")
+        self.writer = DatasetWriter(
+            self.metrics,
+            batch_size=self.push_batch_size,
+            flush_interval=self.push_flush_seconds,
+            queue_size=max(self.push_batch_size * 2, self.max_concurrency),
+            on_flush=self._records_flushed
+        ).start()
+        
+        # Pages skipped on their sitemap lastmod get the same unchanged records as revalidated ones
+        for url in self._lastmod_unchanged:
+            await self._record_page(url, {
+                'url': url,
+                'change_status': 'unchanged',
+                'status_code': None,
+                'checked_at': datetime.now().isoformat()
+            })
+        self._lastmod_unchanged.clear()
+        
+        # Periodic (persistState) and last-chance checkpoints
+        listeners = (
+            (Event.PERSIST_STATE, self._checkpoint_listener),
+            (Event.MIGRATING, self._last_checkpoint_listener),
+            (Event.ABORTING, self._last_checkpoint_listener)
+        )
+        for event, listener in listeners:
+            Actor.on(event, listener)
+        
+        workers = [asyncio.create_task(self._page_worker()) for _ in range(self.max_concurrency)]
+        completed = False
+        try:
+            await asyncio.gather(*workers)
+            # Pages still waiting on PDFs
+            while self._completions:
+                await asyncio.gather(*list(self._completions))
+            completed = True
+        finally:
+            for event, listener in listeners:
+                Actor.off(event, listener)
+            for worker in workers:
+                worker.cancel()
+            for task in list(self._completions):
+                task.cancel()
+            # Each step runs even if an earlier one failed, so state is saved and pools are released
+            try:
+                await self.pdf_queue.close()
+            except Exception as e:
+                Actor.log.error(f"❌ PDF queue shutdown failed: {str(e)}")
+            try:
+                # Flush buffered records before anything else can fail
+                await self.writer.close()
+            except Exception as e:
+                # Records were lost: keep the crawl resumable rather than finished
+                completed = False
+                Actor.log.error(f"❌ Dataset writer failed: {str(e)}")
+            try:
+                await self.checkpoint(finished=completed)
+            except Exception as e:
+                Actor.log.error(f"❌ Final checkpoint failed: {str(e)}")
+            try:
+                await self.save_metrics()
+            except Exception as e:
+                Actor.log.error(f"❌ Saving run metrics failed: {str(e)}")
+            self.close()
+        
+        pages_scraped = self.pages_scraped
+        total_pdfs_processed = self.total_pdfs_processed
         
         Actor.log.info(f"🏁 Scraping completed!")
         Actor.log.info(f"📊 Pages scraped: {pages_scraped}")
         Actor.log.info(f"📄 PDFs processed: {total_pdfs_processed}")
+        Actor.log.info(f"🚦 Rate limiter: {self.rate_limiter.stats()}")
+        if self.page_state.enabled:
+            counts = self.page_state.counts
+            Actor.log.info(f"🔁 Pages new: {counts['new']}, changed: {counts['changed']}, unchanged: {counts['unchanged']}")
+        if self.pdf_cache.enabled:
+            Actor.log.info(f"🗄️ PDF cache: {self.pdf_cache.stats}")
+        if self.near_duplicates:
+            Actor.log.info(f"👯 Near-duplicates: {self.near_duplicates.stats}")
+        if self.pdf_queue.stats['queued']:
+            Actor.log.info(f"📚 PDF queue: {self.pdf_queue.stats}, {self.pdf_queue.bytes_used / 1024 / 1024:.1f}MB downloaded")
+        if self.exporter is not None:
+            sizes = self.exporter.sizes()
+            Actor.log.info(f"📦 Exported {self.exporter.manifest['records']} records as {self.exporter.format} in "
+                           f"{len(self.exporter.manifest['parts'])} parts: metadata {sizes['meta'] / 1024:.1f}KB, text {sizes['text'] / 1024:.1f}KB")
+        if self.search_index is not None:
+            Actor.log.info(f"🔎 Search index: {self.search_index.stats} ({self.search_index.documents} documents, query with search.py)")
+        if self.pdf_prescreen and self.pdf_screen.stats['screened']:
+            Actor.log.info(f"🙈 PDF pre-screen: {self.pdf_screen.stats}")
+        if self.pdf_pool.timeouts:
+            Actor.log.warning(f"⏰ PDF parses killed after {self.pdf_pool.timeout:g}s: {self.pdf_pool.timeouts}")
         
         return pages_scraped
 
@@ -423,26 +3586,104 @@ async def main():
         
         # Configuration with defaults
         max_pages = actor_input.get('max_pages', 10)  # Reduced default due to PDF processing
+        max_depth = actor_input.get('max_depth', 3)
         delay = actor_input.get('delay', 3)  # Increased delay for PDF processing
         extract_pdfs = actor_input.get('extract_pdfs', True)
+        max_concurrency = actor_input.get('max_concurrency', 3)
+        requests_per_second = actor_input.get('requests_per_second')
+        burst = actor_input.get('burst', 1)
+        adaptive_rate_limit = actor_input.get('adaptive_rate_limit', True)
+        pdf_workers = actor_input.get('pdf_workers', min(2, os.cpu_count() or 1))
+        pdf_timeout = actor_input.get('pdf_timeout', 60)
+        pdf_cache = actor_input.get('pdf_cache', True)
+        pdf_cache_max_mb = actor_input.get('pdf_cache_max_mb', 50)
+        incremental = actor_input.get('incremental', False)
+        emit_unchanged = actor_input.get('emit_unchanged', True)
+        metrics_per_page = actor_input.get('metrics_per_page', False)
+        push_batch_size = actor_input.get('push_batch_size', 25)
+        push_flush_seconds = actor_input.get('push_flush_seconds', 5)
+        output_mode = actor_input.get('output_mode', 'inline')
+        pdf_max_chars = actor_input.get('pdf_max_chars', PDF_MAX_CHARS)
+        pdf_max_pages = actor_input.get('pdf_max_pages', PDF_MAX_PAGES)
+        resume_state = actor_input.get('resume_state', True)
+        max_retries = actor_input.get('max_retries', 3)
+        warm_start = actor_input.get('warm_start', True)
+        skip_near_duplicates = actor_input.get('skip_near_duplicates', False)
+        near_duplicate_distance = actor_input.get('near_duplicate_distance', 4)
+        memory_budget_mb = actor_input.get('memory_budget_mb')
+        site_profile = SiteProfile.from_input(actor_input.get('site_profile'))
+        use_sitemaps = actor_input.get('use_sitemaps', True)
+        pdf_concurrency = actor_input.get('pdf_concurrency', 4)
+        pdf_budget_mb = actor_input.get('pdf_budget_mb', 200)
+        pdf_prescreen = actor_input.get('pdf_prescreen', True)
+        export_format = actor_input.get('export_format', 'none')
+        search_index = actor_input.get('search_index', False)
         
-        Actor.log.info(f"📥 Input: max_pages={max_pages}, delay={delay}, extract_pdfs={extract_pdfs}")
+        Actor.log.info(f"📥 Input: max_pages={max_pages}, delay={delay}, extract_pdfs={extract_pdfs}, max_concurrency={max_concurrency}")
+        Actor.log.info(f"🚦 Rate limit: requests_per_second={requests_per_second or f'1/{delay}'}, burst={burst}, adaptive={adaptive_rate_limit}, max_retries={max_retries}")
+        Actor.log.info(f"🧮 PDF parsing: workers={pdf_workers}, timeout={pdf_timeout}s, cache={pdf_cache} ({pdf_cache_max_mb}MB)")
+        Actor.log.info(f"📚 PDF queue: {pdf_concurrency} in flight, budget {pdf_budget_mb or 'unlimited'} MB per run, pre-screen: {pdf_prescreen}")
+        Actor.log.info(f"🧠 Memory budget: {memory_budget_mb or os.environ.get('ACTOR_MEMORY_MBYTES') or 'unlimited'} MB")
+        Actor.log.info(f"📏 PDF text budget: {pdf_max_chars} chars, {pdf_max_pages} pages")
+        Actor.log.info(f"🔁 Incremental: {incremental}, emit unchanged records: {emit_unchanged}")
+        Actor.log.info(f"🧭 Crawl depth limit: {max_depth}, sitemap/feed discovery: {use_sitemaps}")
+        Actor.log.info(f"🗺️ Site: {site_profile.base_url} (domains: {', '.join(sorted(site_profile.domains))}, sections limited: {len(site_profile.section_limits)})")
+        Actor.log.info(f"👯 Skip near-duplicates: {skip_near_duplicates} (distance {near_duplicate_distance} bits)")
+        Actor.log.info(f"🗂️ Output mode: {output_mode}, export: {export_format}, search index: {search_index}, resumable state: {resume_state}, warm start: {warm_start}")
         
         # Validate input
-        if max_pages > 50:
-            Actor.log.warning("⚠️ max_pages limited to 50 for PDF processing performance")
-            max_pages = 50
+        if max_pages > 1000:
+            Actor.log.warning("⚠️ max_pages limited to 1000")
+            max_pages = 1000
         
         if delay < 2:
             Actor.log.warning("⚠️ delay increased to 2 seconds minimum for PDF processing")
             delay = 2
         
+        if output_mode not in ('inline', 'normalized'):
+            Actor.log.warning(f"⚠️ Unknown output_mode '{output_mode}', using 'inline'")
+            output_mode = 'inline'
+        
+        if max_concurrency < 1 or max_concurrency > 10:
+            Actor.log.warning("⚠️ max_concurrency clamped to the 1-10 range")
+            max_concurrency = min(max(max_concurrency, 1), 10)
+        
         try:
             # Initialize and run scraper
             scraper = MRPLScraperV4_WithPDF(
                 max_pages=max_pages, 
                 delay=float(delay),
-                extract_pdfs=extract_pdfs
+                extract_pdfs=extract_pdfs,
+                max_concurrency=max_concurrency,
+                requests_per_second=requests_per_second,
+                burst=burst,
+                adaptive_rate_limit=adaptive_rate_limit,
+                pdf_workers=pdf_workers,
+                pdf_timeout=pdf_timeout,
+                pdf_cache=pdf_cache,
+                pdf_cache_max_mb=pdf_cache_max_mb,
+                incremental=incremental,
+                emit_unchanged=emit_unchanged,
+                max_depth=max_depth,
+                metrics_per_page=metrics_per_page,
+                push_batch_size=push_batch_size,
+                push_flush_seconds=push_flush_seconds,
+                output_mode=output_mode,
+                pdf_max_chars=pdf_max_chars,
+                pdf_max_pages=pdf_max_pages,
+                resume_state=resume_state,
+                max_retries=max_retries,
+                warm_start=warm_start,
+                skip_near_duplicates=skip_near_duplicates,
+                near_duplicate_distance=near_duplicate_distance,
+                memory_budget_mb=memory_budget_mb,
+                site_profile=site_profile,
+                use_sitemaps=use_sitemaps,
+                pdf_concurrency=pdf_concurrency,
+                pdf_budget_mb=pdf_budget_mb,
+                pdf_prescreen=pdf_prescreen,
+                export_format=export_format,
+                search_index=search_index
             )
             pages_scraped = await scraper.run()
             
@@ -452,10 +3693,13 @@ async def main():
             Actor.log.info(f"   • Max pages requested: {max_pages}")
             Actor.log.info(f"   • Delay used: {delay}s")
             Actor.log.info(f"   • PDF extraction: {'Enabled' if extract_pdfs else 'Disabled'}")
+            Actor.log.info(f"   • Concurrency: {max_concurrency}")
             
             if pages_scraped > 0:
                 Actor.log.info("✅ SCRAPING WITH PDF EXTRACTION COMPLETED!")
                 Actor.log.info("📊 Check your dataset for web content + PDF text data")
+            elif scraper.page_state.counts['unchanged'] > 0:
+                Actor.log.info("✅ Nothing changed since the previous run")
             else:
                 Actor.log.error("❌ No pages were scraped - check logs for issues")
                 
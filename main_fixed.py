@@ -4,19 +4,30 @@ import sys
 from apify import Actor
 import requests
 from bs4 import BeautifulSoup
-import time
 from datetime import datetime
 import urllib3
 
+from main import CrawlFrontier, FetchClient, HostRateLimiter, LinkExtractor, SiteProfile
+
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 class MRPLScraper:
-    def __init__(self, max_pages=10, delay=2.0):
+    def __init__(self, max_pages=10, delay=2.0, requests_per_second=None, burst=1, adaptive_rate_limit=True, max_retries=3,
+                 site_profile=None):
         self.max_pages = max_pages
         self.delay = delay
         self.session = requests.Session()
         
+        # Domains, seeds, selectors and URL rules shared with the V4 scraper
+        self.profile = site_profile if isinstance(site_profile, SiteProfile) else SiteProfile.from_input(site_profile)
+        self.links = LinkExtractor(self.profile)
+        
+        # Per-host pacing shared with the V4 scraper; defaults to one request per `delay`
+        if not requests_per_second:
+            requests_per_second = 1.0 / delay if delay else 1.0
+        self.rate_limiter = HostRateLimiter(requests_per_second, burst, adaptive_rate_limit)
+        
         # Configure session to handle SSL issues
         self.session.verify = False  # Disable SSL verification
         self.session.headers.update({
@@ -30,21 +41,28 @@ class MRPLScraper:
         
         # Set timeouts and retries
         self.session.timeout = 30
+        
+        # Shared fetch layer: pacing, retries with backoff and the HTTPS->HTTP fallback
+        self.fetcher = FetchClient(self.session, self.rate_limiter, max_in_flight=1, max_retries=max_retries)
+    
+    async def get(self, url, **kwargs):
+        """Rate-limited, retried GET that reports each outcome back to the limiter"""
+        return await self.fetcher.get(url, **kwargs)
     
     async def test_connection(self):
         """Test if we can connect to the website"""
+        # HTTP is tried by the fetch layer if HTTPS cannot connect
         test_urls = [
-            'https://mrpl.co.in/en/',
-            'http://mrpl.co.in/en/',  # Try HTTP if HTTPS fails
-            'https://mrpl.co.in/',
-            'http://mrpl.co.in/'
+            self.profile.home_url(),
+            self.profile.base_url + '/'
         ]
         
         for url in test_urls:
             try:
                 Actor.log.info(f"🔍 Testing connection to: {url}")
-                response = self.session.get(url, timeout=10, verify=False)
+                response = await self.get(url, timeout=10, verify=False)
                 if response.status_code == 200:
+                    url = self.fetcher.resolve(url)
                     Actor.log.info(f"✅ Connection successful to: {url}")
                     return url
                 else:
@@ -60,32 +78,10 @@ class MRPLScraper:
         try:
             Actor.log.info(f"🌐 Scraping: {url}")
             
-            # Try multiple approaches
-            response = None
-            
-            # Approach 1: HTTPS with SSL disabled
-            try:
-                response = self.session.get(url, timeout=30, verify=False)
-                response.raise_for_status()
-            except Exception as e:
-                Actor.log.warning(f"HTTPS failed for {url}: {str(e)}")
-                
-                # Approach 2: Try HTTP instead of HTTPS
-                if url.startswith('https://'):
-                    http_url = url.replace('https://', 'http://')
-                    try:
-                        Actor.log.info(f"🔄 Trying HTTP: {http_url}")
-                        response = self.session.get(http_url, timeout=30, verify=False)
-                        response.raise_for_status()
-                        url = http_url  # Update URL for logging
-                    except Exception as e2:
-                        Actor.log.error(f"HTTP also failed for {http_url}: {str(e2)}")
-                        return None
-                else:
-                    return None
-            
-            if not response:
-                return None
+            # Retries and the HTTPS->HTTP fallback happen in the fetch layer
+            response = await self.get(url, timeout=30, verify=False)
+            response.raise_for_status()
+            url = self.fetcher.resolve(url)
             
             # Parse content
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -99,12 +95,8 @@ class MRPLScraper:
             description = meta_desc.get('content', '') if meta_desc else ''
             
             # Extract main content
-            content_selectors = [
-                '.main-content', '.content', 'main', '.page-content', 'article', 'body'
-            ]
-            
             content = ''
-            for selector in content_selectors:
+            for selector in self.profile.content_selectors:
                 content_elem = soup.select_one(selector)
                 if content_elem:
                     content = content_elem.get_text(strip=True)
@@ -119,26 +111,8 @@ class MRPLScraper:
             # Limit content length
             content = content[:1500] if len(content) > 1500 else content
             
-            # Extract links
-            links = []
-            pdf_links = []
-            
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                if href:
-                    # Handle relative URLs
-                    if href.startswith('/'):
-                        base_url = url.split('/')[0] + '//' + url.split('/')[2]
-                        absolute_url = base_url + href
-                    elif href.startswith('http'):
-                        absolute_url = href
-                    else:
-                        absolute_url = requests.compat.urljoin(url, href)
-                    
-                    if href.lower().endswith('.pdf'):
-                        pdf_links.append(absolute_url)
-                    elif 'mrpl.co.in' in absolute_url or href.startswith('/'):
-                        links.append(absolute_url)
+            # Extract links: resolved against the page, canonical and deduplicated
+            links, _, pdf_links = self.links.extract(url, [link['href'] for link in soup.find_all('a', href=True)])
             
             result = {
                 'url': url,
@@ -172,35 +146,21 @@ class MRPLScraper:
         
         Actor.log.info(f"🔗 Using base URL: {working_base_url}")
         
-        # Determine protocol and base URL
-        if working_base_url.startswith('http://'):
-            protocol = 'http://'
-            base_domain = 'mrpl.co.in'
-        else:
-            protocol = 'https://'
-            base_domain = 'mrpl.co.in'
+        # Start with the profile's seed pages on the scheme that worked
+        base_url = self.fetcher.resolve(self.profile.base_url)
+        start_urls = self.profile.seed_urls(base_url)
         
-        # Start with main pages - adjust URLs based on working protocol
-        start_urls = [
-            f"{protocol}{base_domain}/en/",
-            f"{protocol}{base_domain}/en/about-us",
-            f"{protocol}{base_domain}/en/products",
-            f"{protocol}{base_domain}/en/media-center",
-            f"{protocol}{base_domain}/en/careers",
-            f"{protocol}{base_domain}/en/investors",
-            f"{protocol}{base_domain}/en/csr",
-            f"{protocol}{base_domain}/en/tenders"
-        ]
-        
-        visited_urls = set()
-        to_visit = start_urls.copy()
+        # Priority frontier with a seen-set replaces the list scans; keep at most 50 URLs queued
+        frontier = CrawlFrontier(max_pages=None, max_depth=None, max_queued=50, profile=self.profile)
+        for url in start_urls:
+            frontier.add(url)
         pages_scraped = 0
         
-        while to_visit and pages_scraped < self.max_pages:
-            url = to_visit.pop(0)
-            
-            if url in visited_urls:
-                continue
+        while pages_scraped < self.max_pages:
+            item = frontier.pop()
+            if item is None:
+                break
+            url, depth = item
             
             Actor.log.info(f"📄 Processing page {pages_scraped + 1}/{self.max_pages}")
             
@@ -210,24 +170,18 @@ class MRPLScraper:
                 # Push data to Apify dataset
                 await Actor.push_data(page_data)
                 
-                visited_urls.add(url)
                 pages_scraped += 1
                 
                 Actor.log.info(f"📊 Page {pages_scraped} completed. Title: {page_data['title'][:50]}...")
                 
                 # Add new URLs to visit (from links found)
                 for link in page_data.get('links', []):
-                    if link not in visited_urls and link not in to_visit and len(to_visit) < 50:
-                        to_visit.append(link)
-                
-                # Delay between requests
-                if pages_scraped < self.max_pages:
-                    Actor.log.info(f"⏱️ Waiting {self.delay} seconds...")
-                    time.sleep(self.delay)
+                    frontier.add(link, depth + 1)
             else:
                 Actor.log.warning(f"⚠️ Failed to scrape: {url}")
         
         Actor.log.info(f"🏁 Scraping completed! Total pages scraped: {pages_scraped}")
+        Actor.log.info(f"🚦 Rate limiter: {self.rate_limiter.stats()}")
         return pages_scraped
 
 async def main():
@@ -241,8 +195,14 @@ async def main():
         # Configuration with defaults
         max_pages = actor_input.get('max_pages', 20)
         delay = actor_input.get('delay', 2)
+        requests_per_second = actor_input.get('requests_per_second')
+        burst = actor_input.get('burst', 1)
+        adaptive_rate_limit = actor_input.get('adaptive_rate_limit', True)
+        max_retries = actor_input.get('max_retries', 3)
+        site_profile = SiteProfile.from_input(actor_input.get('site_profile'))
         
         Actor.log.info(f"📥 Input configuration: max_pages={max_pages}, delay={delay}")
+        Actor.log.info(f"🚦 Rate limit: requests_per_second={requests_per_second or f'1/{delay}'}, burst={burst}, adaptive={adaptive_rate_limit}, max_retries={max_retries}")
         
         # Validate input
         if max_pages > 200:
@@ -255,7 +215,15 @@ async def main():
         
         try:
             # Initialize and run scraper
-            scraper = MRPLScraper(max_pages=max_pages, delay=float(delay))
+            scraper = MRPLScraper(
+                max_pages=max_pages,
+                delay=float(delay),
+                requests_per_second=requests_per_second,
+                burst=burst,
+                adaptive_rate_limit=adaptive_rate_limit,
+                max_retries=max_retries,
+                site_profile=site_profile
+            )
             pages_scraped = await scraper.run()
             
             # Log final statistics
@@ -0,0 +1,58 @@
+"""Query the full-text index built by main.py with search_index enabled.
+
+Usage:
+    python search.py QUERY [--limit 10] [--kind page|pdf] [--index FILE] [--json]
+
+Without --index the index is read from the 'mrpl-search-index' key-value store
+(./storage locally, or the platform store when run with an Apify token). FILE is
+a downloaded INDEX record, gzip-compressed or plain SQLite.
+"""
+import argparse
+import asyncio
+import json
+import os
+
+from apify import Actor
+
+from main import SearchIndex
+
+
+async def load_index(path=None):
+    """SearchIndex from a file or from the named key-value store, or None when nothing was indexed yet"""
+    if path:
+        with open(path, 'rb') as f:
+            return SearchIndex.from_bytes(f.read())
+    # Keep the process alive on exit so the results can be printed
+    async with Actor(exit_process=False):
+        store = await Actor.open_key_value_store(name=SearchIndex().store_name)
+        data = await store.get_value(SearchIndex.STATE_KEY)
+    return SearchIndex.from_bytes(data) if data else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('query', nargs='+', help='Words that must all appear (stemmed, case-insensitive)')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--kind', choices=('page', 'pdf'), help='Only pages or only PDFs')
+    parser.add_argument('--index', help='INDEX file instead of the key-value store')
+    parser.add_argument('--json', action='store_true', help='Print the hits as JSON')
+    args = parser.parse_args()
+    os.environ.setdefault('APIFY_LOG_LEVEL', 'WARNING')
+
+    index = asyncio.run(load_index(args.index))
+    if index is None:
+        print("No search index yet - run the scraper with search_index enabled first")
+        return
+    hits = index.search(' '.join(args.query), limit=args.limit, kind=args.kind)
+    if args.json:
+        print(json.dumps(hits, ensure_ascii=False, indent=2))
+        return
+    print(f"{len(hits)} hits in {len(index)} documents")
+    for rank, hit in enumerate(hits, 1):
+        print(f"{rank:>3}. [{hit['kind']}] {hit['score']:.2f}  {hit['title']}")
+        print(f"     {hit['url']}" + (f"  (linked from {hit['page_url']})" if hit['page_url'] else ''))
+        print(f"     {hit['snippet']}")
+
+
+if __name__ == '__main__':
+    main()